@@ -1,39 +1,77 @@
-import openai
 import json
 import os
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from duckduckgo_search import DDGS
+from llm_client import get_client
+from llm_cache import LLMCacheMiss
+from search_cache import get_search_cache
 
-def search_web(query):
-    """Searches the web for citations."""
+logger = logging.getLogger(__name__)
+
+# Research fan-out: queries run concurrently, each with its own timeout, and
+# the whole search step stops waiting at the deadline
+MAX_QUERIES = 5
+SEARCH_WORKERS = 8
+SEARCH_TIMEOUT = 10
+SEARCH_DEADLINE = 20
+
+def _json_content(response):
+    """The JSON object in a chat completion's reply."""
+    return json.loads(response.choices[0].message.content)
+
+def search_web(query, timeout=SEARCH_TIMEOUT, max_results=2):
+    """Searches the web for citations (through the local search cache, see search_cache.py)."""
     try:
-        results = DDGS().text(query, max_results=2)
+        results = get_search_cache().get(
+            query, max_results, lambda: DDGS(timeout=timeout).text(query, max_results=max_results))
         return "\n".join([f"- {r['title']}: {r['body']} (Source: {r['href']})" for r in results])
     except Exception as e:
         return ""
 
-def enrich_with_research(text):
+def search_all(queries, timeout=SEARCH_TIMEOUT, deadline=SEARCH_DEADLINE, workers=SEARCH_WORKERS):
+    """
+    Runs search_web for every query concurrently. Results come back in query
+    order; a query that fails or misses the deadline gives "".
+    """
+    if not queries:
+        return []
+    pool = ThreadPoolExecutor(max_workers=min(workers, len(queries)))
+    futures = [pool.submit(search_web, q, timeout) for q in queries]
+    done, late = wait(futures, timeout=deadline)
+    # Don't wait for stragglers
+    pool.shutdown(wait=False, cancel_futures=True)
+    if late:
+        print(f"Research: {len(late)} of {len(queries)} searches missed the {deadline}s deadline")
+    return [f.result() if f in done else "" for f in futures]
+
+def enrich_with_research(text, api_key=None):
     """
     Agent 1: Researcher. Adds citations and data.
     """
-    client = openai.OpenAI()
+    client = get_client(api_key)
     
     # 1. Plan
-    plan_prompt = "You are a Fact-Checker. Identify 2 claims in the text needing verification. Return JSON: {'queries': ['query1', 'query2']}"
+    plan_prompt = f"You are a Fact-Checker. Identify up to {MAX_QUERIES} claims in the text needing verification. Return JSON: {{'queries': ['query1', 'query2', ...]}}"
     
     try:
-        response = client.chat.completions.create(
+        response = client.chat(
             model="gpt-4o",
             messages=[{"role": "system", "content": plan_prompt}, {"role": "user", "content": text}],
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            check=_json_content
         )
-        queries = json.loads(response.choices[0].message.content).get('queries', [])
+        queries = _json_content(response).get('queries', [])
     except:
         return text 
 
-    # 2. Search
-    notes = ""
-    for q in queries:
-        notes += f"Search: {q}\n{search_web(q)}\n"
+    # 2. Search (concurrently; notes stay in query order)
+    queries = queries[:MAX_QUERIES]
+    results = search_all(queries)
+    notes = "".join(f"Search: {q}\n{result}\n" for q, result in zip(queries, results))
+    # Cache hit rates are in `python search_cache.py stats`
+    logger.debug("Research: %d of %d searches returned results", sum(1 for result in results if result), len(queries))
 
     # 3. Edit
     edit_prompt = f"""
@@ -45,19 +83,18 @@ def enrich_with_research(text):
     Research Notes: {notes}
     """
     
-    final = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "system", "content": edit_prompt}, {"role": "user", "content": text}]
-    )
+    try:
+        final = client.chat(
+            model="gpt-4o",
+            messages=[{"role": "system", "content": edit_prompt}, {"role": "user", "content": text}]
+        )
+    except LLMCacheMiss as e:
+        # Replay mode, and the notes differ from the recorded run (refreshed or late searches)
+        print(f"Research: {e}; keeping the text as it is")
+        return text
     return final.choices[0].message.content
 
-def analyze_layout_and_data(text):
-    """
-    Agent 2: Art Director. Splits text into visual sections.
-    """
-    client = openai.OpenAI()
-
-    system_prompt = """
+LAYOUT_PROMPT = """
     You are a Design Director for a UN-style report.
     Split the raw text into logical sections and assign a layout mode.
     
@@ -105,14 +142,131 @@ def analyze_layout_and_data(text):
     }
     """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": text}],
-            response_format={"type": "json_object"},
-            temperature=0.2
-        )
-        return json.loads(response.choices[0].message.content)
-    except Exception as e:
-        print(f"Layout Error: {e}")
-        return {"sections": [{"layout": "standard", "main_text": text}]}
+# Long documents are laid out in parts of about this many tokens, concurrently
+LAYOUT_CHUNK_TOKENS = 3000
+CHARS_PER_TOKEN = 4
+LAYOUT_WORKERS = 6
+
+_heading_re = re.compile(r'^#{1,6}\s+(.*)$', re.M)
+_paragraph_re = re.compile(r'\n\s*\n')
+_fence_re = re.compile(r'^ {0,3}(`{3,}|~{3,}).*?(?:^ {0,3}\1[ \t]*$|\Z)', re.M | re.S)
+
+def split_for_layout(text, max_chars):
+    """
+    Splits text into parts of at most max_chars, at markdown headings where
+    possible and otherwise between paragraphs (so tables and lists stay whole;
+    a single paragraph longer than max_chars is kept as is). Fenced code
+    blocks are never split, and '#' lines inside them aren't headings.
+    Returns a list of {'text', 'heading', 'continues'}: the heading the part
+    starts under, and whether it starts in the middle of that heading's section.
+    """
+    fences = [(m.start(), m.end()) for m in _fence_re.finditer(text)]
+
+    def fenced(position):
+        return any(start < position < end for start, end in fences)
+
+    starts = [m.start() for m in _heading_re.finditer(text) if not fenced(m.start())]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+
+    # Pieces: whole heading sections, or paragraph runs of the ones too long for a part
+    pieces = []
+    heading = ""
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        block = text[start:end]
+        match = _heading_re.match(block)
+        if match:
+            heading = match.group(1).strip()
+        if len(block) <= max_chars:
+            pieces.append({'text': block, 'heading': heading, 'continues': False})
+            continue
+        run = ""
+        position = 0
+        first = True
+        for paragraph in _paragraph_re.finditer(block + "\n\n"):
+            if fenced(start + paragraph.start()):
+                continue
+            chunk = block[position:paragraph.end()]
+            position = paragraph.end()
+            if run and len(run) + len(chunk) > max_chars:
+                pieces.append({'text': run, 'heading': heading, 'continues': not first})
+                first = False
+                run = ""
+            run += chunk
+        # Whatever follows the last split point (all of it, when an unclosed fence runs to the end)
+        rest = block[position:]
+        if run and len(run) + len(rest) > max_chars:
+            pieces.append({'text': run, 'heading': heading, 'continues': not first})
+            first = False
+            run = ""
+        run += rest
+        if run:
+            pieces.append({'text': run, 'heading': heading, 'continues': not first})
+
+    # Parts: consecutive pieces packed up to max_chars
+    parts = []
+    for piece in pieces:
+        if parts and len(parts[-1]['text']) + len(piece['text']) <= max_chars:
+            parts[-1]['text'] += piece['text']
+        else:
+            parts.append(dict(piece))
+    return [part for part in parts if part['text'].strip()]
+
+def _analyze_layout(text, note="", api_key=None):
+    """One layout call; note is added to the system prompt."""
+    response = get_client(api_key).chat(
+        model="gpt-4o",
+        messages=[{"role": "system", "content": LAYOUT_PROMPT + note}, {"role": "user", "content": text}],
+        response_format={"type": "json_object"},
+        temperature=0.2,
+        check=_json_content
+    )
+    return _json_content(response)
+
+def analyze_layout_and_data(text, chunk_tokens=LAYOUT_CHUNK_TOKENS, api_key=None):
+    """
+    Agent 2: Art Director. Splits text into visual sections.
+
+    Text longer than chunk_tokens is split into parts (see split_for_layout)
+    that are laid out concurrently and merged in order; chunk_tokens=None
+    always uses one call.
+    """
+    max_chars = chunk_tokens * CHARS_PER_TOKEN if chunk_tokens else None
+    parts = split_for_layout(text, max_chars) if max_chars and len(text) > max_chars else []
+    if len(parts) < 2:
+        try:
+            return _analyze_layout(text, api_key=api_key)
+        except Exception as e:
+            print(f"Layout Error: {e}")
+            return {"sections": [{"layout": "standard", "main_text": text}]}
+
+    def analyze_part(index):
+        part = parts[index]
+        # The note doesn't number the part, so an edit elsewhere leaves this part's request (and cached reply) as it was
+        note = ("\n    This text is one part of a longer document; the parts are laid out separately and joined"
+                " in order. Only add front matter layouts for content that is in this part.")
+        if part['continues']:
+            note += (f" It continues the section \"{part['heading']}\" from the previous part: carry on with that"
+                     f" section's content and do not start with a chapter.")
+        try:
+            return _analyze_layout(part['text'], note, api_key)
+        except Exception as e:
+            # Only this part falls back to plain text
+            print(f"Layout Error (part {index + 1}/{len(parts)}): {e}")
+            return {"sections": [{"layout": "standard", "main_text": part['text']}]}
+
+    with ThreadPoolExecutor(max_workers=min(LAYOUT_WORKERS, len(parts))) as pool:
+        results = list(pool.map(analyze_part, range(len(parts))))
+
+    # Reduce: sections in part order, without a chapter repeated across a part edge
+    sections = []
+    chapter = None
+    for result in results:
+        for section in result.get('sections', []):
+            if section.get('layout') == 'chapter':
+                title = (section.get('title') or '').strip().lower()
+                if title == chapter:
+                    continue
+                chapter = title
+            sections.append(section)
+    return {"sections": sections}
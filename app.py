@@ -3,6 +3,7 @@ import os
 import datetime
 from agent import analyze_layout_and_data, enrich_with_research
 from renderer import ReportRenderer
+from render_server import RenderClient
 
 st.set_page_config(page_title="Intelligent Internet | Report Gen", layout="wide", page_icon="🌐")
 
@@ -25,8 +26,8 @@ st.markdown("""
 with st.sidebar:
     if os.path.exists("assets/logo.png"): st.image("assets/logo.png", width=80)
     st.header("Configuration")
-    api_key = st.text_input("OpenAI API Key", type="password")
-    if api_key: os.environ["OPENAI_API_KEY"] = api_key
+    # Passed to the agents, not put in os.environ, which every session shares
+    api_key = st.text_input("OpenAI API Key", type="password") or os.environ.get("OPENAI_API_KEY")
     
     use_research = st.checkbox("Enable Live Research", help="Agent will search the web for citations.")
 
@@ -45,7 +46,7 @@ summary = st.text_area("Executive Summary", "Enter summary...", height=80)
 text_input = st.text_area("Content Body", "Paste raw text here...", height=300)
 
 if st.button("Generate Report"):
-    if not os.environ.get("OPENAI_API_KEY"):
+    if not api_key:
         st.error("Please enter API Key")
         st.stop()
         
@@ -55,24 +56,38 @@ if st.button("Generate Report"):
         content = text_input
         if use_research:
             status.write("🌍 Research Agent: Verifying facts...")
-            content = enrich_with_research(content)
+            content = enrich_with_research(content, api_key=api_key)
             
         # 2. Layout
         status.write("🧠 Design Agent: Structuring layouts...")
-        layout_plan = analyze_layout_and_data(content)
+        layout_plan = analyze_layout_and_data(content, api_key=api_key)
         
         # 3. Render
         status.write("🎨 Composer: Generating PDF...")
-        renderer = ReportRenderer()
         data = {
             "meta": {"title": r_title, "subtitle": r_subtitle, "date": r_date, "summary": summary},
             "sections": layout_plan.get('sections', [])
         }
         
-        pdf = "Intelligent_Internet_Report.pdf"
-        renderer.create_pdf(data, pdf)
+        # Rendered in memory: nothing on disk for concurrent sessions to overwrite
+        if os.environ.get("REPORT_RENDER_SERVER"):
+            # Warm render server (see render_server.py)
+            pdf = RenderClient().render(data)
+        else:
+            # Per-section spans, to point at the slowest ones
+            section_spans = []
+            # One renderer per click, so no chart process pool: its startup would cost more than it saves
+            renderer = ReportRenderer(chart_workers=0, tracer=lambda name, seconds, attrs: name == 'section' and section_spans.append((seconds, attrs)))
+            try:
+                result = renderer.create_pdf(data, None)
+            finally:
+                renderer.close()
+            pdf = result.pdf
+            status.write("⏱️ " + " · ".join(f"{phase} {seconds:.2f}s" for phase, seconds in result.timings.items()))
+            for seconds, attrs in sorted(section_spans, key=lambda span: span[0], reverse=True)[:3]:
+                chart = f", {attrs['chart_type']} chart ({attrs['chart_bytes']:,} bytes {attrs['chart_format'].upper()})" if attrs['chart_format'] else ""
+                status.write(f"&nbsp;&nbsp;section {attrs['index'] + 1} ({attrs['layout']}{chart}): {seconds:.2f}s")
         
         status.update(label="Done!", state="complete", expanded=False)
         
-        with open(pdf, "rb") as f:
-            st.download_button("📥 Download PDF", f, file_name=pdf)
+        st.download_button("📥 Download PDF", pdf, file_name="Intelligent_Internet_Report.pdf", mime="application/pdf")
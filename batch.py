@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Batch Report Generation
+Renders many stored data packages with a pool of warm renderer processes:
+
+    python batch.py packages/ -o out/ --workers 4
+    python batch.py packages.jsonl -o out/
+
+Input is a directory of *.json data packages or a JSONL file with one package
+per line. A JSONL job is named by the package's "id" field, or else by a hash
+of its line, so editing the file doesn't shift the other jobs; a repeated name
+gets -2, -3, ... in the order the lines appear. Each job writes
+out/<job>.pdf and appends a record (duration, pages,
+bytes, error) to out/manifest.jsonl. Re-running the same command skips jobs
+that already succeeded, so a failed or interrupted batch resumes where it
+stopped; --no-resume renders everything again.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from disk_cache import content_hash
+
+MANIFEST = 'manifest.jsonl'
+
+# --- Worker process side ---
+
+_renderer = None
+
+
+def _init_worker(renderer_options):
+    """Build this worker's renderer and warm it up with a throwaway render."""
+    global _renderer
+    import tempfile
+    from renderer import ReportRenderer
+    from render_server import WARMUP_PACKAGE
+    _renderer = ReportRenderer(**renderer_options)
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    os.close(fd)
+    try:
+        _renderer.create_pdf(json.loads(json.dumps(WARMUP_PACKAGE)), path)
+    except Exception as e:
+        print(f"Warm-up render failed: {e}", file=sys.stderr)
+    finally:
+        os.remove(path)
+
+
+def _render_job(data_package, output):
+    """Render one package; returns (seconds, pages)."""
+    result = _renderer.create_pdf(data_package, output)
+    return result.timings['total'], result.pages
+
+
+# --- Jobs and manifest ---
+
+def iter_jobs(source):
+    """Yield (job id, loader) for every data package in a directory or JSONL file."""
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith('.json'):
+                path = os.path.join(source, name)
+
+                def load(path=path):
+                    with open(path, encoding='utf-8') as f:
+                        return json.load(f)
+                yield os.path.splitext(name)[0], load
+    else:
+        stem = os.path.splitext(os.path.basename(source))[0]
+        seen = set()
+        with open(source, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    job = base = f"{stem}-{_line_id(line)}"
+                    # Repeated ids would write (and resume) the same output file
+                    suffix = 1
+                    while job in seen:
+                        suffix += 1
+                        job = f"{base}-{suffix}"
+                    seen.add(job)
+                    yield job, lambda line=line: json.loads(line)
+
+
+def _line_id(line):
+    """A JSONL package's "id" field (made safe for a file name), else a hash of the line."""
+    try:
+        package_id = json.loads(line).get('id')
+    except (ValueError, AttributeError):
+        package_id = None
+    if package_id is not None:
+        return re.sub(r'[^\w.-]+', '_', str(package_id))
+    return content_hash(line.strip())[:12]
+
+
+def read_manifest(path):
+    """Latest manifest record per job."""
+    records = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                records[record['job']] = record
+    except OSError:
+        pass
+    return records
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else None
+
+
+def run_batch(source, output_dir, workers=2, renderer_options=None, resume=True):
+    """Render every job in source into output_dir; returns the throughput summary."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST)
+    done = read_manifest(manifest_path) if resume else {}
+
+    def finished(job):
+        record = done.get(job)
+        return record and record['status'] == 'ok' and os.path.exists(record['output'])
+
+    all_jobs = list(iter_jobs(source))
+    jobs = [(job, load) for job, load in all_jobs if not finished(job)]
+    skipped = len(all_jobs) - len(jobs)
+    print(f"{len(jobs)} job(s) to render, {skipped} already done")
+
+    # Parallelism comes from the job pool, so renderers draw charts in-process
+    options = {'chart_workers': 0, **(renderer_options or {})}
+    results = []
+    start = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,))
+    try:
+        with open(manifest_path, 'a', encoding='utf-8') as manifest:
+            def record(job, output, seconds=None, pages=None, error=None):
+                entry = {
+                    'job': job,
+                    'output': output,
+                    'status': 'error' if error else 'ok',
+                    'seconds': round(seconds, 3) if seconds is not None else None,
+                    'pages': pages,
+                    'bytes': os.path.getsize(output) if not error else None,
+                    'error': error,
+                    'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                }
+                manifest.write(json.dumps(entry) + '\n')
+                manifest.flush()
+                results.append(entry)
+                status = f"{entry['seconds']:.2f}s, {pages} pages" if not error else f"FAILED: {error}"
+                print(f"[{len(results)}/{len(jobs)}] {job}: {status}")
+
+            pending = iter(jobs)
+            running = {}
+            while True:
+                # Keep a couple of jobs queued per worker; packages are loaded only when submitted
+                while len(running) < workers * 2:
+                    job, load = next(pending, (None, None))
+                    if job is None:
+                        break
+                    output = os.path.join(output_dir, f"{job}.pdf")
+                    try:
+                        running[pool.submit(_render_job, load(), output)] = (job, output)
+                    except (OSError, ValueError) as e:
+                        record(job, output, error=f"could not load package: {e}")
+                if not running:
+                    break
+
+                finished_futures, _ = wait(running, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in finished_futures:
+                    job, output = running.pop(future)
+                    try:
+                        seconds, pages = future.result()
+                        record(job, output, seconds, pages)
+                    except BrokenProcessPool as e:
+                        broken = True
+                        record(job, output, error=f"worker died: {e}")
+                    except Exception as e:
+                        record(job, output, error=f"{type(e).__name__}: {e}")
+                if broken:
+                    # Every job in flight failed with the pool; start a fresh one for the rest
+                    for future, (job, output) in running.items():
+                        record(job, output, error="worker pool died")
+                    running = {}
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,))
+    finally:
+        pool.shutdown()
+
+    elapsed = time.perf_counter() - start
+    ok = [r for r in results if r['status'] == 'ok']
+    latencies = [r['seconds'] for r in ok]
+    summary = {
+        'jobs': len(results),
+        'ok': len(ok),
+        'errors': len(results) - len(ok),
+        'skipped': skipped,
+        'wall_s': round(elapsed, 2),
+        'reports_per_min': round(len(ok) / elapsed * 60, 2) if elapsed else None,
+        'latency_p50_s': percentile(latencies, 0.5),
+        'latency_p95_s': percentile(latencies, 0.95),
+        'pages': sum(r['pages'] for r in ok),
+        'bytes': sum(r['bytes'] for r in ok),
+    }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='directory of *.json data packages or a JSONL file')
+    parser.add_argument('-o', '--output-dir', default='batch_output')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 1) // 2))
+    parser.add_argument('--chart-backend', default='matplotlib', choices=['matplotlib', 'native'])
+    parser.add_argument('--offline', action='store_true', help='never fetch fonts/images from the network')
+    parser.add_argument('--no-resume', dest='resume', action='store_false', help='render jobs that already succeeded again')
+    args = parser.parse_args()
+
+    options = {'chart_backend': args.chart_backend}
+    if args.offline:
+        options['offline'] = True
+    summary = run_batch(args.source, args.output_dir, args.workers, options, args.resume)
+
+    print(f"\n{summary['ok']} ok, {summary['errors']} failed, {summary['skipped']} skipped in {summary['wall_s']}s")
+    if summary['ok']:
+        print(f"{summary['reports_per_min']} reports/min, latency p50 {summary['latency_p50_s']}s, p95 {summary['latency_p95_s']}s")
+        print(f"{summary['pages']} pages, {summary['bytes']:,} bytes")
+    if summary['errors']:
+        print(f"Failed jobs are listed in {os.path.join(args.output_dir, MANIFEST)}; run again to retry them")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
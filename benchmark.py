@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+"""
+Renderer Benchmarks
+Run one benchmark per subcommand, e.g.:
+
+    python benchmark.py charts --charts 40
+    python benchmark.py downsample --points 20000
+    python benchmark.py server --sections 20
+    python benchmark.py startup
+    python benchmark.py incremental --sections 300
+    python benchmark.py memory --sections 3000
+    python benchmark.py markdown --sections 500
+    python benchmark.py pdf --sections 300 --workers 4
+    python benchmark.py suite --save baseline.json
+    python benchmark.py suite --compare baseline.json --threshold 0.15
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+
+def synthetic_chart(rng, chart_type, points=12):
+    """A chart config shaped like the ones the layout agent produces."""
+    if chart_type == 'multi_line':
+        years = list(range(2000, 2000 + points))
+        return {
+            'title': 'Synthetic Multi-Series Trend',
+            'type': 'line',
+            'data': [{'name': f'Series {s + 1}', 'labels': years, 'values': [round(rng.uniform(10, 100), 1) for _ in years]} for s in range(3)],
+            'x_label': 'Year',
+            'y_label': 'Value',
+        }
+    return {
+        'title': f'Synthetic {chart_type.replace("_", " ").title()}',
+        'type': chart_type,
+        'data': {f'Category {i + 1}': round(rng.uniform(5, 95), 1) for i in range(points)},
+        'x_label': 'Category',
+        'y_label': 'Value',
+    }
+
+
+def synthetic_charts(count, seed=0):
+    rng = random.Random(seed)
+    kinds = ['bar', 'horizontal_bar', 'line', 'scatter', 'multi_line']
+    return [synthetic_chart(rng, kinds[i % len(kinds)]) for i in range(count)]
+
+
+def synthetic_package(sections=20, seed=0, layouts=('standard',), chart_every=3, chart_points=12, table_rows=0, text_words=200):
+    """A data package with a chapter every ten sections.
+
+    Sections cycle through layouts; every chart_every-th section gets a chart
+    of chart_points points (0 for none) and, with table_rows, a markdown table
+    of that many rows. The main text is text_words words long.
+    """
+    rng = random.Random(seed)
+    kinds = ['bar', 'horizontal_bar', 'line', 'scatter', 'multi_line']
+    text = ' '.join((['Lorem', 'ipsum', 'dolor', 'sit', 'amet.'] * (text_words // 5 + 1))[:text_words]) + ' '
+    table = ''
+    if table_rows:
+        table = '\n\n| Indicator | 2023 | 2024 | Change |\n|---|---|---|---|\n' + ''.join(
+            f'| Row {r + 1} | {rng.uniform(0, 100):.1f} | {rng.uniform(0, 100):.1f} | {rng.uniform(-5, 5):+.1f}% |\n' for r in range(table_rows))
+    package = {
+        'meta': {'title': 'Synthetic Report', 'subtitle': 'Benchmark', 'date': 'January 2025', 'summary': 'Synthetic benchmark report'},
+        'sections': [],
+    }
+    for i in range(sections):
+        if i % 10 == 0:
+            package['sections'].append({'layout': 'chapter', 'title': f'Chapter {i // 10 + 1}'})
+        layout = layouts[i % len(layouts)]
+        section = {'layout': layout, 'title': f'Section {i + 1}', 'main_text': f'## Section {i + 1}\n\n' + text + table}
+        if layout in ('split', 'sidebar'):
+            section['side_text'] = '- Key insight one\n- Key insight two'
+        if chart_every and chart_points and i % chart_every == 0:
+            section['chart'] = synthetic_chart(rng, kinds[i % len(kinds)], chart_points)
+        package['sections'].append(section)
+    return package
+
+
+def _time_backend(render, charts, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        svgs = [render(chart) for chart in charts]
+        timings.append(time.perf_counter() - start)
+    return min(timings), sum(len(svg.encode('utf-8')) for svg in svgs)
+
+
+def _cold_seconds(setup, statement):
+    """Seconds statement takes in a fresh interpreter, after setup (not timed)."""
+    import subprocess
+    probe = f'{setup}; import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)'
+    out = subprocess.run([sys.executable, '-c', probe], check=True, capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return float(out.split()[-1])
+
+
+def bench_charts(args):
+    """Compare the matplotlib and native SVG chart backends."""
+    from svg_charts import make_native_svg_chart
+    from renderer import make_svg_chart
+
+    charts = synthetic_charts(args.charts)
+    # Cold start of each backend: matplotlib is only imported by the first chart (renderer._pyplot)
+    native_import = _cold_seconds('pass', 'import svg_charts')
+    mpl_import = _cold_seconds('import renderer', 'renderer._pyplot()')
+
+    results = {
+        'matplotlib': (mpl_import, *_time_backend(make_svg_chart, charts, args.repeat)),
+        'native': (native_import, *_time_backend(make_native_svg_chart, charts, args.repeat)),
+    }
+
+    print(f"{len(charts)} charts, best of {args.repeat}")
+    print(f"{'backend':<12}{'import (s)':>12}{'render (s)':>12}{'ms/chart':>10}{'SVG bytes':>14}")
+    for backend, (import_s, render_s, size) in results.items():
+        print(f"{backend:<12}{import_s:>12.3f}{render_s:>12.3f}{render_s / len(charts) * 1000:>10.2f}{size:>14,}")
+    mpl, native = results['matplotlib'], results['native']
+    print(f"native is {mpl[1] / native[1]:.0f}x faster and {mpl[2] / native[2]:.0f}x smaller")
+
+
+def bench_downsample(args):
+    """Point counts, SVG size and render time with and without downsampling."""
+    import math
+    from downsample import downsample_chart
+    from renderer import make_svg_chart
+    from svg_charts import make_native_svg_chart
+
+    rng = random.Random(0)
+    walk = [0.0]
+    for _ in range(args.points - 1):
+        walk.append(walk[-1] + rng.gauss(0, 1))
+    charts = [
+        {'title': 'Dense Line', 'type': 'line', 'data': [{'name': 'Walk', 'labels': list(range(args.points)), 'values': walk}]},
+        {'title': 'Dense Scatter', 'type': 'scatter', 'data': {f'P{i}': round(math.sin(i / 50) * 50 + rng.gauss(0, 5), 2) for i in range(args.points)}},
+    ]
+
+    print(f"{'chart':<15}{'backend':<12}{'points':>16}{'SVG bytes':>24}{'render (s)':>18}")
+    for chart in charts:
+        _, stats = downsample_chart(chart)
+        points = f"{stats['before']} -> {stats['after']}" if stats else 'unchanged'
+        for backend, render in (('matplotlib', make_svg_chart), ('native', make_native_svg_chart)):
+            start = time.perf_counter()
+            raw = render(chart, max_points=10 ** 9)
+            raw_s = time.perf_counter() - start
+            start = time.perf_counter()
+            reduced = render(chart)
+            reduced_s = time.perf_counter() - start
+            sizes = f"{len(raw.encode()):,} -> {len(reduced.encode()):,}"
+            print(f"{chart['title']:<15}{backend:<12}{points:>16}{sizes:>24}{raw_s:>9.2f} -> {reduced_s:.2f}")
+
+
+def bench_server(args):
+    """Wall-clock per report: a cold process per render vs the warm render server."""
+    import json
+    import subprocess
+    import tempfile
+    import threading
+    from render_server import RenderClient, RenderService, make_server
+
+    package = synthetic_package(args.sections)
+    with tempfile.TemporaryDirectory() as tmp:
+        package_path = os.path.join(tmp, 'package.json')
+        with open(package_path, 'w') as f:
+            json.dump(package, f)
+        cold_script = (
+            'import json, sys; from renderer import ReportRenderer; '
+            'ReportRenderer(chart_cache=False, fragment_cache=False).create_pdf(json.load(open(sys.argv[1])), sys.argv[2])'
+        )
+        cold = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', cold_script, package_path, os.path.join(tmp, 'cold.pdf')], check=True)
+            cold.append(time.perf_counter() - start)
+
+    service = RenderService(workers=1, renderer_options={'chart_cache': False, 'fragment_cache': False})
+    service.warm_up()
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = RenderClient(f'http://127.0.0.1:{server.server_address[1]}')
+    warm = []
+    try:
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            client.render(package)
+            warm.append(time.perf_counter() - start)
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+    print(f"{args.sections} sections, {args.repeat} renders each")
+    print(f"cold process: {min(cold):.2f}s best, {sum(cold) / len(cold):.2f}s mean")
+    print(f"warm server:  {min(warm):.2f}s best, {sum(warm) / len(warm):.2f}s mean")
+
+
+def bench_startup(args):
+    """Import time of the renderer and the per-render setup (stylesheet, template)."""
+    import subprocess
+
+    probe = (
+        'import time; t = time.perf_counter(); import renderer; t1 = time.perf_counter(); '
+        'import sys; heavy = [m for m in ("matplotlib", "weasyprint") if m in sys.modules]; '
+        'print(f"{t1 - t:.3f} {\',\'.join(heavy) or \'none\'}")'
+    )
+    imports = []
+    for _ in range(args.repeat):
+        out = subprocess.run([sys.executable, '-c', probe], check=True, capture_output=True, text=True).stdout.split()
+        imports.append(float(out[0]))
+    print(f"import renderer: {min(imports):.3f}s best of {args.repeat} (heavy modules loaded: {out[1]})")
+
+    import renderer
+    for name, setup in (('stylesheet', renderer.get_stylesheet), ('template', renderer.get_template)):
+        start = time.perf_counter()
+        setup()
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            setup()
+        warm = (time.perf_counter() - start) / args.repeat
+        print(f"{name:<11} first {first * 1000:8.1f} ms, then {warm * 1000:8.3f} ms per render")
+
+
+def bench_incremental(args):
+    """Time to reach the HTML stage after a one-section edit, with and without the fragment cache."""
+    import copy
+    import tempfile
+    from disk_cache import DiskCache
+    from renderer import ReportRenderer
+
+    package = synthetic_package(args.sections)
+    with tempfile.TemporaryDirectory() as tmp:
+        charts = DiskCache(os.path.join(tmp, 'charts'))
+        options = {'chart_workers': 0, 'chart_backend': args.chart_backend, 'chart_cache': charts}
+        full = ReportRenderer(fragment_cache=False, **options)
+        incremental = ReportRenderer(fragment_cache=DiskCache(os.path.join(tmp, 'fragments')), **options)
+        # Warm both caches with the unedited report
+        incremental.render_html(copy.deepcopy(package))
+
+        timings = {'full': [], 'incremental': []}
+        for n in range(args.repeat):
+            edited = copy.deepcopy(package)
+            standard = [s for s in edited['sections'] if s['layout'] == 'standard']
+            section = standard[len(standard) // 2]
+            section['main_text'] += f' Edit {n}.'
+            for name, renderer in (('full', full), ('incremental', incremental)):
+                start = time.perf_counter()
+                renderer.render_html(copy.deepcopy(edited))
+                timings[name].append(time.perf_counter() - start)
+
+    print(f"{len(package['sections'])} sections, one edited section, best of {args.repeat}")
+    for name, values in timings.items():
+        print(f"{name:<12}{min(values):8.3f}s to HTML")
+    print(f"incremental takes {min(timings['incremental']) / min(timings['full']):.0%} of the full rebuild")
+
+
+def bench_memory(args):
+    """Peak Python memory (tracemalloc) while building the HTML of a large synthetic report:
+    sections concatenated with += into one string before the template (before) vs
+    streamed through the template and joined once (after)."""
+    import tempfile
+    import tracemalloc
+    from disk_cache import DiskCache
+    from renderer import ReportRenderer, get_template
+
+    package = synthetic_package(args.sections)
+    with tempfile.TemporaryDirectory() as tmp:
+        renderer = ReportRenderer(chart_workers=0, chart_backend='native', fragment_cache=DiskCache(os.path.join(tmp, 'fragments')),
+                                  chart_cache=DiskCache(os.path.join(tmp, 'charts')))
+
+        def concatenated():
+            context, sections, _ = renderer.build_document(package)
+            content = ""
+            for _, html in sections:
+                content += html
+            return get_template().render(sections=[content], **context)
+
+        # Fill the caches first so only assembly is measured
+        renderer.render_html(package)
+        results = {}
+        for name, build in (('before (+=)', concatenated), ('after (stream)', lambda: renderer.render_html(package))):
+            tracemalloc.start()
+            start = time.perf_counter()
+            html = build()
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name] = (html, elapsed, peak)
+
+    (before, _, before_peak), (after, _, after_peak) = results.values()
+    if before != after:
+        print("warning: the two builds produced different HTML")
+    size = len(after.encode('utf-8'))
+    print(f"{len(package['sections'])} sections, {size / 2 ** 20:.1f} MB of HTML")
+    for name, (_, elapsed, peak) in results.items():
+        print(f"{name:<16}{elapsed:6.2f}s  peak traced memory {peak / 2 ** 20:7.1f} MB ({peak / size:.1f}x the output)")
+    print(f"streaming peaks at {after_peak / before_peak:.0%} of the concatenated build")
+
+
+def bench_markdown(args):
+    """Per-call Markdown instances plus regex table numbering vs the reusable converter."""
+    import re
+    import markdown
+    from markdown_engine import EXTENSIONS, convert
+
+    table = '\n\n| Indicator | 2023 | 2024 |\n|---|---|---|\n' + '| Growth | 1.2 | 3.4 |\n' * 8
+    texts = [(f'## Section {i + 1}\n\n' + 'Lorem *ipsum* dolor sit amet. ' * 30 + table * (1 + i % 3),
+              '- Key insight\n- Another insight') for i in range(args.sections)]
+    tables = sum(1 + i % 3 for i in range(args.sections))
+
+    def per_call():
+        for main_text, side_text in texts:
+            count = 0
+
+            def number(match):
+                nonlocal count
+                count += 1
+                return f'<div class="table-wrapper" id="table-{count}"><div class="table-caption">Table {count}</div>{match.group(0)}</div>'
+
+            html = markdown.markdown(main_text, extensions=EXTENSIONS)
+            re.sub(r'<table>.*?</table>', number, html, flags=re.DOTALL)
+            markdown.markdown(side_text, extensions=EXTENSIONS)
+
+    def reused():
+        for main_text, side_text in texts:
+            convert(main_text, str)
+            convert(side_text)
+
+    print(f"{args.sections} sections, {tables} tables, best of {args.repeat}")
+    for name, run in (('per-call + regex', per_call), ('reused + tree', reused)):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        print(f"{name:<18}{min(timings):8.3f}s  {min(timings) / args.sections * 1000:6.2f} ms/section")
+
+
+def _page_texts(pdf):
+    import io
+    from pypdf import PdfReader
+    return [page.extract_text() for page in PdfReader(io.BytesIO(pdf)).pages]
+
+
+def bench_pdf(args):
+    """Wall-clock of the single-pass PDF render vs parallel chunks (charts and fragments cached).
+
+    The chunked PDF is then checked against the single pass: same pages with
+    the same text (page numbers in footers, TOC and lists included) and the
+    same page index. Exits 1 if they differ.
+    """
+    from renderer import ReportRenderer
+
+    package = synthetic_package(args.sections)
+    results = {}
+    outputs = {}
+    for name, workers in (('single pass', 0), (f'{args.workers} workers', args.workers)):
+        renderer = ReportRenderer(pdf_workers=workers)
+        try:
+            # Warm-up render: fills the caches and starts the worker pool
+            outputs[name] = result = renderer.create_pdf(package, None)
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                renderer.create_pdf(package, None)
+                timings.append(time.perf_counter() - start)
+        finally:
+            renderer.close()
+        results[name] = (min(timings), len(result.pdf))
+
+    print(f"{len(package['sections'])} sections, best of {args.repeat}")
+    for name, (seconds, size) in results.items():
+        print(f"{name:<14}{seconds:8.2f}s {size:>12,} bytes")
+    single, parallel = results.values()
+    print(f"chunked render takes {parallel[0] / single[0]:.0%} of the single pass")
+
+    single, chunked = outputs.values()
+    if 'count_pass' not in chunked.timings:
+        print("chunked render fell back to a single pass (see the log)")
+        sys.exit(1)
+    expected, actual = _page_texts(single.pdf), _page_texts(chunked.pdf)
+    differing = [i + 1 for i, (a, b) in enumerate(zip(expected, actual)) if a != b]
+    if len(expected) != len(actual) or differing or single.page_index != chunked.page_index:
+        print(f"chunked PDF differs from the single pass: {len(actual)} vs {len(expected)} pages, "
+              f"text differs on pages {differing[:10]}, page index {'differs' if single.page_index != chunked.page_index else 'matches'}")
+        sys.exit(1)
+    print(f"chunked PDF matches the single pass: {len(actual)} pages, {len(chunked.page_index)} anchors")
+
+
+# Scenarios for the phase suite: synthetic_package() arguments
+SUITE_SCENARIOS = {
+    'small': {'sections': 20},
+    'mixed': {'sections': 100, 'layouts': ['standard', 'split', 'sidebar', 'box', 'hero', 'annex'], 'table_rows': 8},
+    'tables': {'sections': 100, 'chart_every': 0, 'table_rows': 60},
+    'charts': {'sections': 60, 'chart_every': 1, 'chart_points': 200},
+    'long': {'sections': 300, 'text_words': 600},
+}
+
+
+def _suite_phases(params, repeat, chart_backend):
+    """Best-of-repeat seconds for each create_pdf phase on one synthetic package, plus peak RSS.
+
+    Runs in its own process so that peak RSS belongs to this scenario.
+    """
+    import copy
+    import resource
+    import tempfile
+    from disk_cache import DiskCache
+    from markdown_engine import convert
+    from renderer import ReportRenderer, assets_dir, get_stylesheet
+
+    package = synthetic_package(**params)
+    sections = package['sections']
+    charts = [s['chart'] for s in sections if s.get('chart')]
+    phases = {}
+
+    def timed(name, run):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        phases[name] = round(best, 4)
+        return result
+
+    with tempfile.TemporaryDirectory() as tmp:
+        renderer = ReportRenderer(chart_workers=0, chart_backend=chart_backend, chart_cache=False,
+                                  fragment_cache=DiskCache(os.path.join(tmp, 'fragments')))
+        # Markdown conversion, including table numbering and captions
+        timed('markdown', lambda: [(convert(s.get('main_text', ''), str, s.get('tables')), convert(s.get('side_text', '')))
+                                   for s in sections])
+        timed('charts', lambda: renderer._plot_charts(charts))
+        # Fragments are cached after the first render, so this is numbering plus the Jinja template
+        renderer.render_html(copy.deepcopy(package))
+        html = timed('template', lambda: renderer.render_html(copy.deepcopy(package)))
+
+        from weasyprint import HTML
+        # Parsed once per process, so this is the cold cost
+        start = time.perf_counter()
+        css, font_config = get_stylesheet(renderer.get_url_fetcher())
+        phases['stylesheet'] = round(time.perf_counter() - start, 4)
+        document = timed('layout', lambda: HTML(string=html, base_url=assets_dir, url_fetcher=renderer.get_url_fetcher()).render(
+            stylesheets=[css], font_config=font_config))
+        pdf = timed('pdf_write', lambda: document.write_pdf())
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+    return {
+        'params': params,
+        'phases': phases,
+        'total_s': round(sum(phases.values()), 4),
+        'peak_rss_mb': round(peak_mb, 1),
+        'pages': len(document.pages),
+        'pdf_bytes': len(pdf),
+    }
+
+
+def compare_results(baseline, current, threshold):
+    """Rows of (scenario, metric, baseline, current, regressed) for the metrics both runs have."""
+    rows = []
+    for name, result in current['scenarios'].items():
+        old = baseline['scenarios'].get(name)
+        if old is None:
+            continue
+        metrics = [(phase, old['phases'].get(phase), seconds) for phase, seconds in result['phases'].items()]
+        metrics += [('total_s', old.get('total_s'), result['total_s']), ('peak_rss_mb', old.get('peak_rss_mb'), result['peak_rss_mb'])]
+        for metric, before, after in metrics:
+            if before is None:
+                continue
+            # Ignore changes below 5 ms / 5 MB; they are noise
+            floor = 5 if metric == 'peak_rss_mb' else 0.005
+            rows.append((name, metric, before, after, after > before * (1 + threshold) and after - before > floor))
+    return rows
+
+
+def bench_suite(args):
+    """Per-phase timings and peak RSS for a set of synthetic reports, saved to or compared with a JSON baseline."""
+    import json
+    import multiprocessing
+    import platform
+    from concurrent.futures import ProcessPoolExecutor
+
+    scenarios = {name: SUITE_SCENARIOS[name] for name in args.scenarios} if args.scenarios else SUITE_SCENARIOS
+    current = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'chart_backend': args.chart_backend,
+        'scenarios': {},
+    }
+    for name, params in scenarios.items():
+        # A fresh process per scenario so peak RSS isn't carried over
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            result = pool.submit(_suite_phases, params, args.repeat, args.chart_backend).result()
+        current['scenarios'][name] = result
+        phases = '  '.join(f"{phase} {seconds:.3f}" for phase, seconds in result['phases'].items())
+        print(f"{name:<8} {result['total_s']:7.3f}s  {result['peak_rss_mb']:7.1f} MB  {result['pages']:4} pages  | {phases}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare_results(baseline, current, args.threshold)
+        print(f"\nAgainst {args.compare} ({baseline.get('created', '?')}), threshold +{args.threshold:.0%}")
+        print(f"{'scenario':<10}{'metric':<14}{'baseline':>10}{'current':>10}{'change':>9}")
+        for name, metric, before, after, regressed in rows:
+            change = f"{(after - before) / before:+.0%}" if before else 'n/a'
+            print(f"{name:<10}{metric:<14}{before:>10.3f}{after:>10.3f}{change:>9}{'  REGRESSION' if regressed else ''}")
+        regressions = sum(1 for row in rows if row[-1])
+        print(f"{regressions} regression(s)")
+        if regressions:
+            sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('charts', help='matplotlib vs native chart backend')
+    p.add_argument('--charts', type=int, default=40)
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_charts)
+
+    p = sub.add_parser('downsample', help='dense line/scatter charts with and without downsampling')
+    p.add_argument('--points', type=int, default=20000)
+    p.set_defaults(func=bench_downsample)
+
+    p = sub.add_parser('server', help='cold process vs warm render server')
+    p.add_argument('--sections', type=int, default=20)
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_server)
+
+    p = sub.add_parser('startup', help='renderer import time and per-render setup')
+    p.add_argument('--repeat', type=int, default=5)
+    p.set_defaults(func=bench_startup)
+
+    p = sub.add_parser('incremental', help='HTML stage after a one-section edit, with and without the fragment cache')
+    p.add_argument('--sections', type=int, default=300)
+    p.add_argument('--repeat', type=int, default=3)
+    p.add_argument('--chart-backend', default='matplotlib', choices=['matplotlib', 'native'])
+    p.set_defaults(func=bench_incremental)
+
+    p = sub.add_parser('memory', help='peak memory of HTML assembly for a large report')
+    p.add_argument('--sections', type=int, default=3000)
+    p.set_defaults(func=bench_memory)
+
+    p = sub.add_parser('markdown', help='markdown conversion and table numbering')
+    p.add_argument('--sections', type=int, default=500)
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_markdown)
+
+    p = sub.add_parser('pdf', help='single-pass vs parallel chunked PDF render')
+    p.add_argument('--sections', type=int, default=300)
+    p.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_pdf)
+
+    p = sub.add_parser('suite', help='per-phase timings and peak RSS with a JSON baseline')
+    p.add_argument('--scenarios', nargs='+', choices=list(SUITE_SCENARIOS), help='default: all')
+    p.add_argument('--repeat', type=int, default=3)
+    p.add_argument('--chart-backend', default='matplotlib', choices=['matplotlib', 'native'])
+    p.add_argument('--save', metavar='JSON', help='write the results as a baseline')
+    p.add_argument('--compare', metavar='JSON', help='compare with a saved baseline; exits 1 on regressions')
+    p.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown before flagging (default 0.10)')
+    p.set_defaults(func=bench_suite)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+
+
+def cache_dir(name):
+    """Default directory for a named cache (root overridable with REPORT_CACHE_DIR)."""
+    root = os.environ.get('REPORT_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'intelligent-internet-report')
+    return os.path.join(root, name)
+
+
+def content_hash(*parts):
+    """Stable SHA-256 over strings, bytes and JSON-serialisable values."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        elif not isinstance(part, bytes):
+            # Key order is kept on purpose: for chart data it is the plotting order
+            part = json.dumps(part, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+        h.update(str(len(part)).encode() + b':' + part)
+    return h.hexdigest()
+
+
+class DiskCache:
+    """Content-addressed file cache with size-bounded LRU eviction.
+
+    Entries are files named by key; a hit bumps the file's mtime, and when the
+    total size goes over max_bytes the least recently used files are removed.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        """File that holds (or would hold) the entry for key."""
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Return the cached bytes for key, or None."""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """Store bytes under key, then evict down to max_bytes."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += len(value) - old_size
+        self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _evict(self):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            if self._total_bytes <= self.max_bytes:
+                return
+            entries = sorted(self._entries(), key=lambda e: e[2])
+            self._total_bytes = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    self._total_bytes -= size
+                except OSError:
+                    pass
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            for path, _, _ in list(self._entries()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Hit/miss counters plus current entry count and size."""
+        entries = list(self._entries())
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
@@ -0,0 +1,146 @@
+"""Downsampling for dense line and scatter charts.
+
+A printed chart can't show more points than it has device pixels across, so
+series longer than that are reduced before plotting: line charts with
+Largest-Triangle-Three-Buckets (keeps the visual shape), scatter charts with
+min/max bucketing (keeps the extremes). numpy is only imported once a series
+actually needs reducing.
+"""
+import re
+import logging
+
+from image_assets import PRINT_DPI
+
+logger = logging.getLogger(__name__)
+
+# Matplotlib figures are 8in wide; at print DPI one point per two device pixels is plenty
+FIGURE_WIDTH_IN = 8
+
+
+def target_points(width_in=FIGURE_WIDTH_IN, dpi=PRINT_DPI):
+    """Maximum useful points per series for a figure of this width and DPI."""
+    return int(width_in * dpi / 2)
+
+
+def lttb(x, y, n):
+    """Indices of the n points Largest-Triangle-Three-Buckets keeps."""
+    import numpy as np
+
+    size = len(y)
+    if n >= size or n < 3:
+        return np.arange(size)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # First and last points are always kept; the rest is split into n - 2 buckets
+    edges = np.linspace(1, size - 1, n - 1).astype(int)
+    # Average point of every bucket, computed in one pass with cumulative sums
+    cx, cy = np.concatenate(([0], np.cumsum(x))), np.concatenate(([0], np.cumsum(y)))
+    counts = np.diff(edges)
+    avg_x = np.append((cx[edges[1:]] - cx[edges[:-1]]) / counts, x[-1])
+    avg_y = np.append((cy[edges[1:]] - cy[edges[:-1]]) / counts, y[-1])
+
+    keep = np.empty(n, dtype=int)
+    keep[0], keep[-1] = 0, size - 1
+    prev = 0
+    for b in range(n - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Triangle area between the previous kept point, each candidate and the next bucket's average
+        area = np.abs((x[prev] - avg_x[b + 1]) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y[b + 1] - y[prev]))
+        prev = lo + int(np.argmax(area))
+        keep[b + 1] = prev
+    return keep
+
+
+def minmax(y, n):
+    """Indices of the min and max of each of n // 2 equal buckets, in order."""
+    import numpy as np
+
+    size = len(y)
+    if n >= size or n < 2:
+        return np.arange(size)
+    buckets = n // 2
+    width = -(-size // buckets)
+    # Pad to a whole number of buckets so every bucket is reduced in one vectorised step
+    body = np.full(buckets * width, np.nan)
+    body[:size] = np.asarray(y, dtype=float)
+    body = body.reshape(buckets, width)
+    filled = ~np.isnan(body).all(axis=1)
+    offsets = np.arange(buckets)[filled] * width
+    body = body[filled]
+    picks = np.concatenate((offsets + np.nanargmin(body, axis=1), offsets + np.nanargmax(body, axis=1)))
+    return np.unique(picks)
+
+
+def _reduce(chart_type, x, y, max_points):
+    if chart_type == 'scatter':
+        return minmax(y, max_points)
+    return lttb(x, y, max_points)
+
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def downsample_chart(chart_config, max_points=None):
+    """Return (chart_config, stats), reducing line/scatter series longer than max_points.
+
+    The input config is never modified. stats is None when nothing was reduced,
+    otherwise {'before': n, 'after': m} point counts over all series.
+    """
+    max_points = max_points or target_points()
+    chart_type = chart_config.get('type', 'bar')
+    data = chart_config.get('data')
+    if chart_type not in ('line', 'scatter') or not data:
+        return chart_config, None
+
+    if isinstance(data, dict):
+        if len(data) <= max_points or not all(_is_number(v) for v in data.values()):
+            return chart_config, None
+        labels = list(data.keys())
+        values = list(data.values())
+        keep = _reduce(chart_type, range(len(values)), values, max_points)
+        reduced = {labels[i]: values[i] for i in keep}
+        stats = {'before': len(values), 'after': len(reduced)}
+    else:
+        if all(len(s.get('values', [])) <= max_points for s in data):
+            return chart_config, None
+        reduced = []
+        stats = {'before': 0, 'after': 0}
+        for series in data:
+            values = list(series.get('values', []))
+            labels = list(series.get('labels', range(len(values))))
+            stats['before'] += len(values)
+            if len(values) > max_points and all(_is_number(v) for v in values):
+                x = labels if all(_is_number(l) for l in labels) else range(len(values))
+                keep = _reduce(chart_type, x, values, max_points)
+                series = {**series, 'values': [values[i] for i in keep], 'labels': [labels[i] for i in keep]}
+            stats['after'] += len(series.get('values', []))
+            reduced.append(series)
+
+    if stats['after'] == stats['before']:
+        return chart_config, None
+    logger.info("Downsampled %s chart %r: %d -> %d points", chart_type, chart_config.get('title', ''), stats['before'], stats['after'])
+    return {**chart_config, 'data': reduced}, stats
+
+
+_PATH_DATA = re.compile(r'\sd="([^"]*)"')
+_DECIMAL = re.compile(r'(-?\d+\.\d+)')
+
+
+def _round_numbers(text, precision):
+    def repl(m):
+        s = f'{float(m.group(1)):.{precision}f}'.rstrip('0').rstrip('.')
+        return '0' if s == '-0' else s
+    return _DECIMAL.sub(repl, text)
+
+
+def simplify_svg_paths(svg, precision=2):
+    """Round path coordinates in an SVG document and collapse redundant whitespace.
+
+    Only path data is touched; transforms (e.g. glyph scaling) keep full precision.
+    """
+    def repl(m):
+        d = ' '.join(_round_numbers(m.group(1), precision).split())
+        return f' d="{d}"'
+    return _PATH_DATA.sub(repl, svg)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Caching URL Fetcher
+WeasyPrint url_fetcher that serves remote resources (Google Fonts CSS, font
+files, images) from local content-addressed stores instead of the network:
+
+1. assets/vendor/  - committed copies, written by `python fetcher.py vendor`
+2. the user cache  - filled by every render that does go to the network
+
+Local file:// and data: URLs are passed straight through (known raster assets
+via the image pipeline, see image_assets.py). In offline mode
+(offline=True or REPORT_OFFLINE=1) a resource found in neither store stops
+the render immediately instead of waiting on a network timeout.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import argparse
+from urllib.parse import urljoin
+
+from weasyprint.urls import URLFetcher, URLFetcherResponse, FatalURLFetchingError
+
+from disk_cache import DiskCache, cache_dir, content_hash
+
+logger = logging.getLogger(__name__)
+
+assets_dir = os.path.join(os.path.dirname(__file__), 'assets')
+VENDOR_DIR = os.path.join(assets_dir, 'vendor')
+
+
+class CachingURLFetcher(URLFetcher):
+    """URLFetcher backed by a vendored store and a persistent DiskCache.
+
+    Each URL maps to {sha, content_type} metadata, and bodies are stored once
+    under their SHA-256, so identical resources share storage. Every network
+    fetch is logged with its latency and recorded in self.fetch_log.
+    """
+
+    def __init__(self, cache=None, offline=None, vendor_dir=VENDOR_DIR, images=None, **kwargs):
+        super().__init__(**kwargs)
+        # Optional image_assets.ImagePipeline that right-sizes stylesheet rasters (e.g. the page background)
+        self.images = images
+        self.cache = cache if cache is not None else DiskCache(cache_dir('assets'))
+        self.offline = os.environ.get('REPORT_OFFLINE') == '1' if offline is None else offline
+        self.vendor_dir = vendor_dir
+        self.fetch_log = []
+        self._vendor_index = None
+
+    def _vendored(self, url):
+        if not self.vendor_dir:
+            return None
+        if self._vendor_index is None:
+            try:
+                with open(os.path.join(self.vendor_dir, 'index.json'), encoding='utf-8') as f:
+                    self._vendor_index = json.load(f)
+            except (OSError, ValueError):
+                self._vendor_index = {}
+        entry = self._vendor_index.get(url)
+        if entry:
+            try:
+                with open(os.path.join(self.vendor_dir, entry['sha']), 'rb') as f:
+                    return f.read(), entry['content_type']
+            except OSError:
+                pass
+        return None
+
+    def _cached(self, url):
+        meta = self.cache.get('url-' + content_hash(url))
+        if meta is not None:
+            meta = json.loads(meta)
+            body = self.cache.get(meta['sha'])
+            if body is not None:
+                return body, meta['content_type']
+        return None
+
+    def _download(self, url, headers=None):
+        """Fetch from the network, log it and store the result in the cache."""
+        start = time.perf_counter()
+        response = super().fetch(url, headers)
+        try:
+            body = response.read()
+        finally:
+            response.close()
+        elapsed = time.perf_counter() - start
+        content_type = response.content_type
+        logger.info("Fetched %s (%d bytes, %s) in %.0f ms", url, len(body), content_type, elapsed * 1000)
+        self.fetch_log.append({'url': url, 'bytes': len(body), 'seconds': round(elapsed, 4)})
+
+        sha = content_hash(body)
+        self.cache.set(sha, body)
+        self.cache.set('url-' + content_hash(url), json.dumps({'sha': sha, 'content_type': content_type}).encode())
+        return body, content_type
+
+    def fetch(self, url, headers=None):
+        if not url.lower().startswith(('http:', 'https:')):
+            optimized = self.images.resolve(url) if self.images is not None else None
+            if optimized:
+                url = 'file://' + optimized
+            return super().fetch(url, headers)
+
+        found = self._vendored(url) or self._cached(url)
+        if found is None:
+            if self.offline:
+                raise FatalURLFetchingError(f"Offline mode: {url} is not vendored or cached")
+            found = self._download(url, headers)
+        body, content_type = found
+        return URLFetcherResponse(url, body, headers={'Content-Type': content_type})
+
+
+def vendor(stylesheet=os.path.join(assets_dir, 'style.css'), vendor_dir=VENDOR_DIR):
+    """Copy every remote resource referenced by the stylesheet (and the CSS it imports) into vendor_dir."""
+    os.makedirs(vendor_dir, exist_ok=True)
+    fetcher = CachingURLFetcher(offline=False, vendor_dir=None)
+    index_path = os.path.join(vendor_dir, 'index.json')
+    try:
+        with open(index_path, encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    with open(stylesheet, encoding='utf-8') as f:
+        css = f.read()
+    pending = [u for u in re.findall(r"""url\(\s*['"]?([^'")]+)['"]?\s*\)""", css) if u.startswith(('http:', 'https:'))]
+    seen = set()
+    while pending:
+        url = pending.pop(0)
+        if url in seen:
+            continue
+        seen.add(url)
+        body, content_type = fetcher._cached(url) or fetcher._download(url)
+        sha = content_hash(body)
+        with open(os.path.join(vendor_dir, sha), 'wb') as f:
+            f.write(body)
+        index[url] = {'sha': sha, 'content_type': content_type}
+        print(f"Vendored {url} ({len(body):,} bytes)")
+        if content_type == 'text/css':
+            # Fonts referenced from imported CSS, relative to that CSS
+            text = body.decode('utf-8', 'replace')
+            pending += [urljoin(url, u) for u in re.findall(r"""url\(\s*['"]?([^'")]+)['"]?\s*\)""", text) if not u.startswith('data:')]
+
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('vendor', help='download remote stylesheet resources into assets/vendor')
+    parser.parse_args()
+
+    index = vendor()
+    print(f"{len(index)} resources in {VENDOR_DIR}")
+
+
+if __name__ == '__main__':
+    main()
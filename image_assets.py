@@ -0,0 +1,141 @@
+"""Raster asset pipeline.
+
+Downsamples and recompresses raster images to the print DPI of the box they
+are drawn in, so full-resolution sources aren't embedded in every PDF. Results
+are cached by source content hash and target size; because the optimized file
+name is content-addressed, the same image used twice resolves to the same URL
+and WeasyPrint embeds it once.
+"""
+import io
+import os
+import logging
+from urllib.parse import unquote, urlparse
+
+from disk_cache import DiskCache, cache_dir, content_hash
+
+logger = logging.getLogger(__name__)
+
+assets_dir = os.path.join(os.path.dirname(__file__), 'assets')
+
+PRINT_DPI = 300
+# Rendered box widths in inches (A4, 2cm side margins, see style.css)
+PAGE_WIDTH_IN = 210 / 25.4
+CONTENT_WIDTH_IN = (210 - 40) / 25.4
+# Cover logo is drawn 160px wide (template.html)
+LOGO_WIDTH_IN = 160 / 96
+# Stylesheet/template assets and the width they are drawn at
+ASSET_BOXES = {
+    os.path.join(assets_dir, 'background_mesh.png'): PAGE_WIDTH_IN,
+    os.path.join(assets_dir, 'logo.png'): LOGO_WIDTH_IN,
+}
+RASTER_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp', '.tif', '.tiff')
+
+# Bump when the encoding settings change so old cache entries are not reused
+PIPELINE_VERSION = 3
+
+
+class ImagePipeline:
+    """Right-size raster images for print and keep a per-asset savings report."""
+
+    def __init__(self, dpi=PRINT_DPI, cache=None):
+        self.dpi = dpi
+        self.cache = cache if cache is not None else DiskCache(cache_dir('images'))
+        self.report = {}
+
+    def optimize(self, path, box_width_in):
+        """Return the path of an optimized copy of path (or path itself if it can't be improved)."""
+        path = os.path.abspath(path)
+        if not path.lower().endswith(RASTER_EXTENSIONS):
+            return path
+        try:
+            with open(path, 'rb') as f:
+                source = f.read()
+        except OSError:
+            return path
+
+        target_px = int(box_width_in * self.dpi)
+        base = content_hash(source, target_px, PIPELINE_VERSION)
+        # Cache files keep an image extension: .png/.jpg, or the source's when it is kept as is
+        source_ext = os.path.splitext(path)[1].lower()
+        key = next((base + ext for ext in ('.png', '.jpg', source_ext) if os.path.exists(self.cache.path(base + ext))), None)
+        if key is None:
+            try:
+                optimized = _encode(source, target_px)
+            except Exception as e:
+                logger.warning("Could not optimize %s: %s", path, e)
+                return path
+            # Keep the source when re-encoding doesn't pay off
+            data = optimized if len(optimized) < len(source) else source
+            key = base + (_extension(data) or source_ext)
+            self.cache.set(key, data)
+        out_path = self.cache.path(key)
+
+        if path not in self.report:
+            after = os.path.getsize(out_path)
+            self.report[path] = {'before': len(source), 'after': after, 'saved': len(source) - after}
+            logger.info("Image %s: %d -> %d bytes (%d%% saved)", os.path.basename(path), len(source), after,
+                        100 * (len(source) - after) // max(len(source), 1))
+        return out_path
+
+    def url_for(self, path, box_width_in=CONTENT_WIDTH_IN):
+        """file:// URL of the optimized image, for <img src>."""
+        return 'file://' + self.optimize(path, box_width_in)
+
+    def resolve(self, url):
+        """Optimized path for a known stylesheet/template asset URL, else None."""
+        if not url.startswith('file:'):
+            return None
+        path = os.path.abspath(unquote(urlparse(url).path))
+        if path in ASSET_BOXES:
+            return self.optimize(path, ASSET_BOXES[path])
+        return None
+
+    def total_saved(self):
+        return sum(entry['saved'] for entry in self.report.values())
+
+
+def _extension(data):
+    """'.png' or '.jpg' for PNG/JPEG data, else None."""
+    if data.startswith(b'\x89PNG'):
+        return '.png'
+    if data.startswith(b'\xff\xd8'):
+        return '.jpg'
+    return None
+
+
+def _encode(source, target_px):
+    """Resize to at most target_px wide and recompress (PNG when alpha matters, else the smaller of PNG/JPEG).
+
+    EXIF orientation is applied to the pixels (the re-encoded file has no
+    EXIF) and the ICC profile is kept, so photos keep their rotation and colours.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(source)) as im:
+        im.load()
+        if getattr(im, 'is_animated', False):
+            return source
+        icc_profile = im.info.get('icc_profile')
+        im = ImageOps.exif_transpose(im)
+
+        # Palette (and 1-bit, 16-bit, CMYK, ...) images are converted before resizing:
+        # Pillow resizes 'P' and '1' with NEAREST whatever filter is asked for
+        has_alpha = im.mode in ('RGBA', 'LA', 'PA') or 'transparency' in im.info
+        if has_alpha and im.mode != 'RGBA':
+            im = im.convert('RGBA')
+        elif not has_alpha and im.mode not in ('RGB', 'L'):
+            im = im.convert('RGB')
+        if im.width > target_px:
+            im = im.resize((target_px, round(im.height * target_px / im.width)), Image.LANCZOS)
+
+        if has_alpha and im.getchannel('A').getextrema() == (255, 255):
+            has_alpha = False
+            im = im.convert('RGB')
+
+        png = io.BytesIO()
+        im.save(png, format='PNG', optimize=True, icc_profile=icc_profile)
+        if has_alpha:
+            return png.getvalue()
+        jpeg = io.BytesIO()
+        im.convert('RGB').save(jpeg, format='JPEG', quality=85, optimize=True, progressive=True, icc_profile=icc_profile)
+        return min(png.getvalue(), jpeg.getvalue(), key=len)
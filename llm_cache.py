@@ -0,0 +1,47 @@
+"""LLM response cache.
+
+Chat completions are stored in a DiskCache keyed by everything that shapes
+the answer: model, messages (system prompt and input text), temperature,
+response_format and any other request option. Re-running the pipeline on the
+same input then costs no API calls and gives the same report every time.
+
+In replay mode (replay=True or REPORT_OFFLINE=1) responses only come from
+the cache and a request that was never made raises LLMCacheMiss, so a whole
+pipeline run can be reproduced without network access.
+"""
+import os
+
+from disk_cache import DiskCache, cache_dir, content_hash
+
+# Bump when the stored format changes so old entries are not reused
+LLM_CACHE_VERSION = 1
+
+
+class LLMCacheMiss(RuntimeError):
+    """Replay mode found no cached response for a request."""
+
+
+def request_key(request):
+    """Cache key for chat.completions.create(**request); option order doesn't matter."""
+    return content_hash(LLM_CACHE_VERSION, dict(sorted(request.items())))
+
+
+class LLMCache:
+    """ChatCompletion responses in a DiskCache (True for the default location, or a DiskCache)."""
+
+    def __init__(self, cache=True, replay=None, max_bytes=64 * 1024 * 1024):
+        self.cache = DiskCache(cache_dir('llm'), max_bytes=max_bytes) if cache is True else cache
+        self.replay = os.environ.get('REPORT_OFFLINE') == '1' if replay is None else replay
+
+    def get(self, request):
+        """The cached response for request, or None (LLMCacheMiss in replay mode)."""
+        data = self.cache.get(request_key(request))
+        if data is None:
+            if self.replay:
+                raise LLMCacheMiss(f"Replay mode: no cached {request.get('model')} response for this request")
+            return None
+        from openai.types.chat import ChatCompletion
+        return ChatCompletion.model_validate_json(data)
+
+    def set(self, request, response):
+        self.cache.set(request_key(request), response.model_dump_json().encode('utf-8'))
@@ -0,0 +1,168 @@
+"""Shared OpenAI client for the agents.
+
+One lazily created openai.OpenAI per process and API key, so HTTP keep-alive
+connections (and their TLS sessions) are reused across calls instead of being
+set up again for every request. Transient failures (connection errors, timeouts,
+429 and 5xx responses) are retried with exponential backoff and full jitter,
+honouring Retry-After; every call's latency and retry count is recorded.
+
+Responses are cached by request (llm_cache.py), so identical calls, e.g. a
+regenerate of the same input, don't reach the API at all.
+
+The endpoint comes from base_url or OPENAI_BASE_URL, so the agents can be
+pointed at a local stand-in server, e.g.
+OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=test;
+test_llm_client.py runs the client against such a server.
+"""
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque
+
+from llm_cache import LLMCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 120
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20
+RETRY_STATUSES = (408, 409, 429)
+
+
+class LLMClient:
+    """openai.OpenAI wrapper with a pooled connection, retries and call statistics."""
+
+    def __init__(self, base_url=None, api_key=None, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES,
+                 backoff=BACKOFF_BASE, max_backoff=BACKOFF_MAX, cache=True, replay=None):
+        self.base_url = base_url or os.environ.get('OPENAI_BASE_URL')
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._client = None
+        # Response cache: True for the default location, a DiskCache, or False to disable
+        self.cache = LLMCache(cache, replay) if cache else None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.latencies = deque(maxlen=1000)
+
+    @property
+    def client(self):
+        """The underlying openai.OpenAI (built on first use; its HTTP client owns the connection pool)."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import openai
+                    # Retries are done here, so they can be counted
+                    self._client = openai.OpenAI(base_url=self.base_url, api_key=self.api_key, timeout=self.timeout,
+                                                 max_retries=0)
+        return self._client
+
+    def _retry_after(self, error, attempt):
+        """Seconds to wait before the next attempt, or None if error is not worth retrying."""
+        import openai
+
+        if isinstance(error, openai.APIStatusError):
+            if error.status_code not in RETRY_STATUSES and error.status_code < 500:
+                return None
+            header = error.response.headers.get('retry-after')
+            if header:
+                try:
+                    return min(float(header), self.max_backoff)
+                except ValueError:
+                    pass
+        elif not isinstance(error, openai.APIConnectionError):
+            # APITimeoutError is an APIConnectionError; anything else is a bug or a bad request
+            return None
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def chat(self, timeout=None, check=None, **kwargs):
+        """client.chat.completions.create(**kwargs), from the response cache or with retries; timeout (seconds) is per attempt.
+
+        Only complete answers (finish_reason 'stop') are cached, and only once
+        check(response), if given, has returned without raising, so a reply the
+        caller can't use is asked for again next time instead of replayed.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(kwargs)
+            if cached is not None:
+                with self._lock:
+                    self.cache_hits += 1
+                logger.info("LLM call %s: cached", kwargs.get('model'))
+                return cached
+        response = self._create(timeout, kwargs)
+        if check is not None:
+            check(response)
+        if self.cache is not None and all(choice.finish_reason == 'stop' for choice in response.choices):
+            self.cache.set(kwargs, response)
+        return response
+
+    def _create(self, timeout, kwargs):
+        start = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    return self.client.chat.completions.create(timeout=timeout or self.timeout, **kwargs)
+                except Exception as e:
+                    delay = self._retry_after(e, attempt) if attempt < self.max_retries else None
+                    if delay is None:
+                        with self._lock:
+                            self.errors += 1
+                        raise
+                    attempt += 1
+                    logger.info("LLM call failed (%s: %s); retry %d/%d in %.1fs",
+                                type(e).__name__, e, attempt, self.max_retries, delay)
+                    time.sleep(delay)
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.calls += 1
+                self.retries += attempt
+                self.latencies.append(seconds)
+            logger.info("LLM call %s: %.2fs, %d retries", kwargs.get('model'), seconds, attempt)
+
+    def stats(self):
+        """Call counts, retries, cache hits and latency percentiles (of calls that reached the API)."""
+        with self._lock:
+            latencies = sorted(self.latencies)
+
+            def pct(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3) if latencies else None
+
+            return {
+                'calls': self.calls,
+                'retries': self.retries,
+                'errors': self.errors,
+                'cache_hits': self.cache_hits,
+                'latency_p50_s': pct(0.5),
+                'latency_p95_s': pct(0.95),
+                'latency_mean_s': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            }
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_client(api_key=None):
+    """The process-wide LLMClient for api_key (default: OPENAI_API_KEY as it is now).
+
+    Each key gets its own client, so a changed key is used straight away and
+    every caller is billed to the key it passed.
+    """
+    api_key = api_key or os.environ.get('OPENAI_API_KEY')
+    client = _shared.get(api_key)
+    if client is None:
+        with _shared_lock:
+            client = _shared.get(api_key)
+            if client is None:
+                client = _shared[api_key] = LLMClient(api_key=api_key)
+    return client
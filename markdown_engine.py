@@ -0,0 +1,136 @@
+"""Markdown conversion for report sections.
+
+One Markdown converter is built per thread and reused with reset(), instead
+of building a new instance (and loading every extension) for each call.
+Table numbering and captions are applied by a tree processor during the
+conversion rather than by pattern-matching the HTML afterwards.
+"""
+import re
+import html
+import threading
+import xml.etree.ElementTree as etree
+
+import markdown
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import HTML_PLACEHOLDER_RE
+
+EXTENSIONS = ['tables', 'footnotes', 'extra', 'nl2br', 'sane_lists']
+
+_table_tag_re = re.compile(r'<(/?)table\b[^>]*>', re.I)
+
+
+class TableNumberProcessor(Treeprocessor):
+    """Wrap each top-level table in a numbered, captioned div.
+
+    Markdown tables are wrapped in the tree; tables written as raw HTML are
+    still stashed strings at this point and are wrapped in the stash, by
+    counting <table> and </table> tags so a table nested in another one is
+    left alone. An inline raw table is stashed one tag at a time, so its
+    wrapper opens in one stash entry and closes in a later one. Tables are
+    numbered in document order. Reads the per-conversion settings left on
+    the Markdown instance by convert() (md.table_number, md.table_captions)
+    and records the caption of every table it wraps in md.tables.
+    """
+
+    def caption(self):
+        """(number, caption) of the next table."""
+        index = len(self.md.tables)
+        table_num = self.md.table_number(index)
+        caption = f"Table {table_num}"
+        if len(self.md.table_captions) > index:
+            caption = self.md.table_captions[index].get('caption', caption)
+        self.md.tables.append(caption)
+        return table_num, caption
+
+    def wrap(self, parent, table):
+        """Move table into a wrapper div in its place; returns the wrapper."""
+        table_num, caption = self.caption()
+        wrapper = etree.Element('div', {'class': 'table-wrapper', 'id': f"table-{table_num}"})
+        label = etree.SubElement(wrapper, 'div', {'class': 'table-caption'})
+        label.text = f"Table {table_num}: {caption}"
+        position = list(parent).index(table)
+        parent.remove(table)
+        wrapper.append(table)
+        wrapper.tail, table.tail = table.tail, None
+        parent.insert(position, wrapper)
+        return wrapper
+
+    def raw_tag(self, match):
+        """Replacement for one raw <table> or </table> tag."""
+        if match.group(1):
+            if self.depth == 0:
+                return match.group(0)
+            self.depth -= 1
+            return match.group(0) + ('</div>' if self.depth == 0 else '')
+        self.depth += 1
+        if self.depth > 1:
+            return match.group(0)
+        table_num, caption = self.caption()
+        return (f'<div class="table-wrapper" id="table-{table_num}"><div class="table-caption">'
+                f'Table {table_num}: {html.escape(caption, quote=False)}</div>{match.group(0)}')
+
+    def scan(self, text):
+        """Wrap the raw tables behind the stash placeholders in text."""
+        stash = self.md.htmlStash.rawHtmlBlocks
+        for placeholder in HTML_PLACEHOLDER_RE.finditer(text or ''):
+            index = int(placeholder.group(1))
+            if index < len(stash) and isinstance(stash[index], str):
+                stash[index] = _table_tag_re.sub(self.raw_tag, stash[index])
+
+    def walk(self, parent):
+        self.scan(parent.text)
+        for child in list(parent):
+            if child.tag == 'table':
+                last = self.wrap(parent, child) if self.depth == 0 else child
+                self.depth += 1
+                self.walk(child)
+                self.depth -= 1
+            else:
+                last = child
+                self.walk(child)
+            self.scan(last.tail)
+
+    def run(self, root):
+        if self.md.table_number is None:
+            return
+        self.depth = 0
+        self.walk(root)
+
+
+class TableNumberExtension(Extension):
+    def extendMarkdown(self, md):
+        md.table_number = None
+        md.table_captions = []
+        md.tables = []
+        # After inline patterns (20), before prettify (10) so the wrapper is indented like the rest
+        md.treeprocessors.register(TableNumberProcessor(md), 'table_number', 15)
+
+
+_local = threading.local()
+
+
+def get_converter():
+    """This thread's Markdown instance (built on first use)."""
+    md = getattr(_local, 'md', None)
+    if md is None:
+        md = _local.md = markdown.Markdown(extensions=EXTENSIONS + [TableNumberExtension()])
+    return md
+
+
+def convert(text, table_number=None, table_captions=None):
+    """Convert markdown to HTML, returning (html, table captions).
+
+    With table_number (index -> number string) each table is wrapped in a
+    numbered caption, taken from table_captions ([{'caption': ...}, ...]) by
+    the table's index in the text, else "Table <number>". Without it tables
+    are left as they are and the caption list is empty.
+    """
+    md = get_converter()
+    md.reset()
+    md.table_number = table_number
+    md.table_captions = table_captions or []
+    # Set here, not in the processor: Markdown skips the tree processors for blank text
+    md.tables = []
+    html = md.convert(text or '')
+    return html, md.tables
@@ -0,0 +1,225 @@
+"""Parallel chunked PDF rendering.
+
+WeasyPrint lays out a document in one thread. For long reports the document
+is split at chapter boundaries instead: the front chunk (cover, TOC, lists
+and anything before the first chapter) and one chunk per chapter are laid
+out in worker processes and the PDFs are stitched together with pypdf.
+
+What a single pass gets from seeing the whole document is restored by hand:
+
+* Page numbers: WeasyPrint numbers physical pages, so each chunk starts its
+  page counter (``@page :first``) after the pages of the chunks before it.
+  That needs the page counts, so chunks are laid out once to count pages
+  and once more with the right numbers.
+* TOC/list links and page numbers: links to anchors in other chunks get an
+  invisible placeholder anchor so WeasyPrint keeps them, and their page
+  numbers are passed as data-page attributes (see style.css). After merging,
+  every named destination is pointed at the page its anchor really is on.
+* Running headers (string(chapter-title)) and the roman-numeral front
+  matter need nothing: every chunk starts with its own chapter title, and the
+  front matter is the front chunk.
+"""
+import io
+import re
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from renderer import assets_dir, get_stylesheet, get_template
+from image_assets import ImagePipeline
+
+logger = logging.getLogger(__name__)
+
+_id_re = re.compile(r'\bid="([^"]+)"')
+_href_re = re.compile(r'\bhref="#([^"]+)"')
+
+# --- Worker process side ---
+
+_fetcher = None
+
+
+def _init_worker(settings):
+    """Rebuild the renderer's url_fetcher from fetcher_settings() and load the stylesheet and fonts once per worker."""
+    global _fetcher
+    from disk_cache import DiskCache
+    from fetcher import CachingURLFetcher
+    offline, vendor_dir, cache_directory, image_dpi = settings
+    _fetcher = CachingURLFetcher(cache=DiskCache(cache_directory), offline=offline, vendor_dir=vendor_dir,
+                                 images=ImagePipeline(dpi=image_dpi) if image_dpi else None)
+    get_stylesheet(_fetcher)
+
+
+def fetcher_settings(url_fetcher):
+    """What a worker needs to rebuild url_fetcher, or None if it can't be rebuilt.
+
+    Only a plain CachingURLFetcher can be recreated in another process; any
+    other fetcher (a subclass, a function) stays in this one.
+    """
+    from fetcher import CachingURLFetcher
+    if type(url_fetcher) is not CachingURLFetcher:
+        return None
+    images = url_fetcher.images
+    return url_fetcher.offline, url_fetcher.vendor_dir, url_fetcher.cache.directory, images.dpi if images else None
+
+
+def _layout_chunk(html, placeholders=(), write=False):
+    """Lay out one chunk: (page count, {anchor: page index}, PDF bytes if write)."""
+    from weasyprint import HTML
+    css, font_config = get_stylesheet(_fetcher)
+    document = HTML(string=html, base_url=assets_dir, url_fetcher=_fetcher).render(
+        stylesheets=[css], font_config=font_config)
+    anchors = {name: index for index, page in enumerate(document.pages) for name in page.anchors
+               if name not in placeholders}
+    return len(document.pages), anchors, document.write_pdf() if write else None
+
+
+# --- Chunking ---
+
+def split_chunks(sections):
+    """Group (section, html) pairs into the front chunk and one chunk per chapter."""
+    chunks = [[]]
+    for section, html in sections:
+        if section.get('layout') == 'chapter':
+            chunks.append([])
+        chunks[-1].append(html)
+    return chunks
+
+
+def chunk_html(context, htmls, front, first_page=None, page_numbers=None):
+    """A standalone HTML document for one chunk.
+
+    Only the front chunk gets the cover, TOC and lists. first_page starts the
+    page counter; page_numbers ({anchor: page}) fills in page numbers for
+    links to other chunks.
+    """
+    chunk_context = dict(context) if front else dict(context, cover=False, toc='')
+    html = "".join(get_template().generate(sections=iter(htmls), **chunk_context))
+
+    ids = set(_id_re.findall(html))
+    missing = sorted(set(_href_re.findall(html)) - ids)
+    if missing:
+        # Zero-size, out-of-flow anchors so WeasyPrint keeps the links (they are re-pointed after merging)
+        anchors = "".join(f'<div id="{name}"></div>' for name in missing)
+        html = html.replace('<body>', f'<body><div style="position: absolute; width: 0; height: 0; overflow: hidden">{anchors}</div>', 1)
+    if page_numbers:
+        html = _href_re.sub(lambda m: f'{m.group(0)} data-page="{page_numbers[m.group(1)]}"'
+                            if m.group(1) in page_numbers and m.group(1) not in ids else m.group(0), html)
+    if first_page is not None:
+        html = html.replace('</head>', f'<style>@page :first {{ counter-reset: page {first_page} }}</style></head>', 1)
+    return html, set(missing)
+
+
+def merge_pdfs(pdfs, anchors, output):
+    """Concatenate chunk PDFs, keeping links, and point each named destination at its real page."""
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.generic import TextStringObject
+
+    writer = PdfWriter()
+    readers = [PdfReader(io.BytesIO(pdf)) for pdf in pdfs]
+    offsets = []
+    for reader in readers:
+        offsets.append(len(writer.pages))
+        # Named destinations are merged before annotations, so placeholder links survive
+        writer.append(reader)
+
+    # Placeholders may have registered a name first; rebuild the name tree from the real anchors
+    dests = {}
+    for reader, offset, real in zip(readers, offsets, anchors):
+        for name, dest in reader.named_destinations.items():
+            if name in real:
+                array = dest.dest_array
+                array[0] = writer.pages[offset + reader.get_destination_page_number(dest)].indirect_reference
+                dests[name] = array
+    names = writer.get_named_dest_root()
+    del names[:]
+    for name in sorted(dests):
+        names.extend([TextStringObject(name), dests[name]])
+
+    writer.write(output)
+
+
+def write_chunked(renderer, context, sections, output, timings=None):
+    """Render a built document (context and (section, html) pairs from
+    build_document()) to output (a path or binary file object) in parallel chunks.
+
+    Returns ({anchor: page index in the merged PDF}, page count), or
+    (None, None) without writing anything when the report has no chapters to
+    split at, the renderer's url_fetcher can't be rebuilt in the workers, the
+    front matter's page count doesn't settle or the worker pool fails, so the
+    caller can fall back to a single pass with the same sections. Phase
+    seconds are added to timings.
+    """
+    start = time.perf_counter()
+    chunks = split_chunks(sections)
+    if len(chunks) < 2:
+        return None, None
+    settings = fetcher_settings(renderer.get_url_fetcher())
+    if settings is None:
+        logger.info("Custom url_fetcher can't be used by the PDF workers, rendering in a single pass")
+        return None, None
+
+    try:
+        if renderer._pdf_pool is not None and renderer._pdf_pool_settings != settings:
+            renderer._pdf_pool.shutdown()
+            renderer._pdf_pool = None
+        if renderer._pdf_pool is None:
+            renderer._pdf_pool = ProcessPoolExecutor(max_workers=renderer.pdf_workers, initializer=_init_worker,
+                                                     initargs=(settings,))
+            renderer._pdf_pool_settings = settings
+        pool = renderer._pdf_pool
+
+        # Pass 1: page counts (and anchor pages) of every chunk
+        documents = [chunk_html(context, htmls, front=i == 0) for i, htmls in enumerate(chunks)]
+        counts = [None] * len(chunks)
+        anchors = [None] * len(chunks)
+        pdfs = [None] * len(chunks)
+        futures = [pool.submit(_layout_chunk, html, placeholders) for html, placeholders in documents]
+        for i, future in enumerate(futures):
+            counts[i], anchors[i], _ = future.result()
+        layout_seconds = time.perf_counter() - start
+
+        # Pass 2: lay out again with the real page numbers. The front chunk's
+        # length can (rarely) change once its page numbers are filled in; if it
+        # does, the chapters are redone with the corrected numbering.
+        for _ in range(3):
+            first_pages = [1]
+            for count in counts[:-1]:
+                first_pages.append(first_pages[-1] + count)
+            page_numbers = {name: first_pages[i] + index for i in range(len(chunks))
+                            for name, index in anchors[i].items()}
+
+            futures = {0: pool.submit(_layout_chunk, *chunk_html(context, chunks[0], True, None, page_numbers), write=True)}
+            for i in range(1, len(chunks)):
+                if pdfs[i] is None:
+                    html, placeholders = chunk_html(context, chunks[i], False, first_pages[i], page_numbers)
+                    futures[i] = pool.submit(_layout_chunk, html, placeholders, write=True)
+            front_count = counts[0]
+            for i, future in futures.items():
+                counts[i], anchors[i], pdfs[i] = future.result()
+            if counts[0] == front_count:
+                break
+            pdfs[1:] = [None] * (len(chunks) - 1)
+        else:
+            logger.warning("Front matter page count did not settle (%d pages), rendering in a single pass", counts[0])
+            return None, None
+    except (BrokenProcessPool, OSError) as e:
+        logger.warning("PDF pool error, rendering in a single pass: %s", e)
+        if renderer._pdf_pool is not None:
+            renderer._pdf_pool.shutdown()
+            renderer._pdf_pool = None
+        return None, None
+
+    merge_start = time.perf_counter()
+    merge_pdfs(pdfs, anchors, output)
+    if timings is not None:
+        # The template runs inside both passes, so it is part of their time
+        timings.update({
+            'count_pass': layout_seconds,
+            'final_pass': merge_start - start - layout_seconds,
+            'merge': time.perf_counter() - merge_start,
+        })
+
+    offsets = [sum(counts[:i]) for i in range(len(chunks))]
+    return {name: offset + index for offset, chunk_anchors in zip(offsets, anchors)
+            for name, index in chunk_anchors.items()}, sum(counts)
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+PDF Size Tools
+Shows where the bytes of a generated report go and shrinks it after the fact:
+
+    python pdf_tools.py analyze comprehensive_demo.pdf
+    python pdf_tools.py optimize report.pdf -o report.min.pdf --linearize
+
+analyze breaks the file down by category: embedded fonts, images, images
+drawn on most pages (the background mesh), vector drawing (chart paths,
+rules, backgrounds), text, and structure (page/font dictionaries, links,
+xref). Content streams are split between text and vector drawing by the
+share of their operators inside BT/ET blocks.
+
+optimize merges identical objects, drops unreferenced ones and recompresses
+page content streams (pypdf). pikepdf (a requirement: without it WeasyPrint
+output doesn't get any smaller) then packs objects into object streams, and
+--linearize writes a linearized ("fast web view") file so browsers can show
+the first page before the rest arrives.
+ReportRenderer(size_budget=...) runs fit_to_budget() on every PDF it
+produces.
+"""
+
+import io
+import os
+import re
+import time
+import logging
+import argparse
+import importlib.util
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ('fonts', 'images', 'background', 'vector', 'text', 'structure')
+# An image drawn on at least this share of the pages counts as background
+BACKGROUND_SHARE = 0.5
+
+_text_block_re = re.compile(rb'\bBT\b.*?\bET\b', re.S)
+_resource_use_re = re.compile(rb'/([^\s/\[\]()<>{}%]+)\s+(?:Do|scn|SCN|sh)\b')
+
+
+def _reader(source):
+    from pypdf import PdfReader
+    return PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def _size(source):
+    if isinstance(source, bytes):
+        return len(source)
+    if hasattr(source, 'getbuffer'):
+        return source.getbuffer().nbytes
+    return os.path.getsize(source)
+
+
+def _ref(value):
+    """Object number of an indirect reference or of a resolved indirect object, else None."""
+    if value is None:
+        return None
+    if hasattr(value, 'idnum'):
+        return value.idnum
+    reference = getattr(value, 'indirect_reference', None)
+    return reference.idnum if reference is not None else None
+
+
+def _streams(value):
+    """Indirect object numbers of a stream or array of streams (e.g. /Contents)."""
+    if value is None:
+        return []
+    obj = value.get_object()
+    if isinstance(obj, list):
+        return [_ref(item) for item in obj if _ref(item) is not None]
+    return [_ref(value)] if _ref(value) is not None else []
+
+
+def _resource_refs(resources):
+    """{name: object number} of the XObjects, patterns and shadings in a resource dictionary."""
+    refs = {}
+    if resources is None:
+        return refs
+    resources = resources.get_object()
+    for kind in ('/XObject', '/Pattern', '/Shading'):
+        entries = resources.get(kind)
+        if entries is not None:
+            for name, value in entries.get_object().items():
+                if _ref(value) is not None:
+                    refs[name[1:].encode('latin-1')] = _ref(value)
+    return refs
+
+
+def analyze(source):
+    """Bytes per category of a PDF (path, file object or bytes).
+
+    Returns {'total', 'pages', 'categories': {category: bytes}, 'objects':
+    {category: count}, 'largest': [(bytes, category, description), ...]}.
+    Stream sizes are their stored (compressed) lengths; whatever isn't a
+    stream is structure.
+    """
+    from pypdf.generic import StreamObject
+
+    reader = _reader(source)
+    total = _size(source)
+    pages = reader.pages
+
+    objects = {}
+    numbers = set(reader.xref_objStm).union(*(entries for entries in reader.xref.values()))
+    for number in sorted(numbers):
+        try:
+            obj = reader.get_object(number)
+        except Exception:
+            continue
+        if obj is not None:
+            objects[number] = obj
+
+    # What each stream is, from how it is referenced
+    kinds = {}
+    for number, obj in objects.items():
+        if not hasattr(obj, 'get'):
+            continue
+        kind = obj.get('/Type')
+        if kind == '/FontDescriptor':
+            for key in ('/FontFile', '/FontFile2', '/FontFile3'):
+                if _ref(obj.get(key)) is not None:
+                    kinds[_ref(obj[key])] = 'fonts'
+        elif kind == '/Font':
+            for key in ('/ToUnicode', '/CIDToGIDMap'):
+                if _ref(obj.get(key)) is not None:
+                    kinds[_ref(obj[key])] = 'fonts'
+        if isinstance(obj, StreamObject):
+            subtype = obj.get('/Subtype')
+            if subtype == '/Image':
+                kinds.setdefault(number, 'images')
+                if _ref(obj.get('/SMask')) is not None:
+                    kinds[_ref(obj['/SMask'])] = 'images'
+            elif subtype == '/Form' or kind == '/Pattern' or obj.get('/PatternType') is not None:
+                kinds.setdefault(number, 'content')
+    for page in pages:
+        for number in _streams(page.get('/Contents')):
+            kinds[number] = 'content'
+
+    # Pages that draw each image, directly or through forms and patterns
+    drawn_on = Counter()
+    for page in pages:
+        seen = set()
+        pending = [(number, page.get('/Resources')) for number in _streams(page.get('/Contents'))]
+        while pending:
+            number, resources = pending.pop()
+            obj = objects.get(number)
+            if obj is None or not isinstance(obj, StreamObject):
+                continue
+            try:
+                data = obj.get_data()
+            except Exception:
+                continue
+            refs = _resource_refs(obj.get('/Resources', resources))
+            for name in set(_resource_use_re.findall(data)):
+                used = refs.get(name)
+                if used is None or used in seen:
+                    continue
+                seen.add(used)
+                if kinds.get(used) == 'images':
+                    drawn_on[used] += 1
+                else:
+                    pending.append((used, obj.get('/Resources', resources)))
+    for number, count in drawn_on.items():
+        if len(pages) > 1 and count >= max(2, BACKGROUND_SHARE * len(pages)):
+            kinds[number] = 'background'
+            mask = _ref(objects[number].get('/SMask'))
+            if mask is not None:
+                kinds[mask] = 'background'
+
+    categories = dict.fromkeys(CATEGORIES, 0)
+    counts = Counter()
+    largest = []
+    for number, obj in objects.items():
+        if not isinstance(obj, StreamObject) or obj.get('/Type') in ('/ObjStm', '/XRef'):
+            continue
+        stored = len(obj._data)
+        kind = kinds.get(number, 'structure')
+        if kind == 'content':
+            # Split between text and vector drawing by operator bytes
+            try:
+                data = obj.get_data()
+            except Exception:
+                data = b''
+            text = sum(len(block) for block in _text_block_re.findall(data))
+            text_bytes = stored * text // len(data) if data else 0
+            categories['text'] += text_bytes
+            categories['vector'] += stored - text_bytes
+            # Counted under whichever share is larger
+            kind = 'vector' if text_bytes * 2 < stored else 'text'
+        else:
+            categories[kind] += stored
+        counts[kind] += 1
+        description = f"object {number}"
+        if '/Width' in obj:
+            description += f" ({obj['/Width']}x{obj['/Height']} image)"
+        elif kinds.get(number) == 'fonts':
+            description += " (font data)"
+        largest.append((stored, kind, description))
+
+    categories['structure'] += total - sum(categories.values())
+    largest.sort(reverse=True)
+    return {
+        'total': total,
+        'pages': len(pages),
+        'categories': categories,
+        'objects': dict(counts),
+        'largest': largest[:10],
+    }
+
+
+def format_report(report):
+    """analyze() output as a table."""
+    lines = [f"{report['total']:,} bytes, {report['pages']} pages"]
+    for category, size in sorted(report['categories'].items(), key=lambda item: -item[1]):
+        share = 100 * size / report['total'] if report['total'] else 0
+        objects = report['objects'].get(category)
+        lines.append(f"  {category:<12}{size:>12,}  {share:5.1f}%" + (f"  ({objects} objects)" if objects else ""))
+    lines.append("Largest streams:")
+    for size, category, description in report['largest']:
+        lines.append(f"  {size:>12,}  {category:<12}{description}")
+    return "\n".join(lines)
+
+
+def optimize(source, linearize=False):
+    """Deduplicated, recompressed (and optionally linearized) copy of a PDF, as bytes.
+
+    Without linearization the result is never larger than the input: pypdf
+    writes no object streams, so on its own it can cost more than it saves.
+    """
+    from pypdf import PdfWriter
+
+    if isinstance(source, bytes):
+        original = source
+    elif hasattr(source, 'read'):
+        original = source.read()
+    else:
+        with open(source, 'rb') as f:
+            original = f.read()
+
+    writer = PdfWriter(clone_from=_reader(original))
+    for page in writer.pages:
+        page.compress_content_streams(level=9)
+    writer.compress_identical_objects(remove_duplicates=True, remove_unreferenced=True)
+    buf = io.BytesIO()
+    writer.write(buf)
+    pdf, linearized = _repack(buf.getvalue(), linearize)
+    if not linearized and len(pdf) >= len(original):
+        return original
+    return pdf
+
+
+def _repack(pdf, linearize):
+    """(pdf, linearized): packed into object streams and linearized on request by pikepdf (qpdf), if installed."""
+    try:
+        import pikepdf
+    except ImportError:
+        if linearize:
+            logger.warning("pikepdf is not installed; writing a non-linearized PDF")
+        return pdf, False
+    out = io.BytesIO()
+    with pikepdf.open(io.BytesIO(pdf)) as document:
+        document.save(out, linearize=linearize, compress_streams=True, recompress_flate=True,
+                      object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    return out.getvalue(), linearize
+
+
+def fit_to_budget(pdf, budget, linearize=False):
+    """PDF bytes optimized if they are over budget; logs the breakdown if they still are.
+
+    Needs pikepdf to optimize: the pypdf rewrite alone takes seconds and
+    doesn't make WeasyPrint output any smaller (optimize() keeps the input).
+    """
+    if len(pdf) <= budget and not linearize:
+        return pdf
+    if importlib.util.find_spec('pikepdf') is not None:
+        start = time.perf_counter()
+        optimized = optimize(pdf, linearize)
+        logger.info("Optimized PDF: %d -> %d bytes (budget %d) in %.1fs", len(pdf), len(optimized), budget,
+                    time.perf_counter() - start)
+        pdf = optimized
+    else:
+        logger.info("pikepdf is not installed; leaving the %d byte PDF as it is", len(pdf))
+    if len(pdf) > budget:
+        categories = analyze(pdf)['categories']
+        logger.warning("PDF is %d bytes, over its %d byte budget: %s", len(pdf), budget,
+                       ", ".join(f"{name} {size:,}" for name, size in sorted(categories.items(), key=lambda item: -item[1]) if size))
+    return pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('analyze', help='bytes per object category')
+    p.add_argument('pdf')
+    p = sub.add_parser('optimize', help='deduplicate, recompress and optionally linearize')
+    p.add_argument('pdf')
+    p.add_argument('-o', '--output', help='default: <name>.min.pdf')
+    p.add_argument('--linearize', action='store_true', help='fast web view (needs pikepdf)')
+    args = parser.parse_args()
+
+    if args.command == 'analyze':
+        print(format_report(analyze(args.pdf)))
+        return
+
+    output = args.output or os.path.splitext(args.pdf)[0] + '.min.pdf'
+    before = os.path.getsize(args.pdf)
+    pdf = optimize(args.pdf, args.linearize)
+    with open(output, 'wb') as f:
+        f.write(pdf)
+    print(f"Wrote {output}: {before:,} -> {len(pdf):,} bytes ({100 * (before - len(pdf)) // max(before, 1)}% saved)")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Warm Render Server
+Keeps WeasyPrint, matplotlib, fonts, the stylesheet and the template loaded in a
+bounded pool of worker processes and renders data packages to PDF on request.
+
+    python render_server.py serve --port 8765 --workers 4
+    python render_server.py serve --socket /tmp/report-render.sock
+    python render_server.py render package.json -o report.pdf --server http://127.0.0.1:8765
+
+API (localhost HTTP or a Unix socket):
+    POST /render   JSON data package -> application/pdf
+    GET  /health   liveness
+    GET  /metrics  request counts, latency percentiles, worker info
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import http.client
+import socketserver
+from collections import deque
+from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+WARMUP_PACKAGE = {
+    'meta': {'title': 'Warm-up', 'subtitle': '', 'date': '', 'summary': ''},
+    'sections': [
+        {'layout': 'chapter', 'title': 'Warm-up'},
+        {'layout': 'standard', 'main_text': '**Warm-up** render.\n\n| A | B |\n|---|---|\n| 1 | 2 |',
+         'chart': {'title': 'Warm-up', 'type': 'bar', 'data': {'A': 1, 'B': 2}}},
+    ],
+}
+
+# --- Worker process side ---
+
+_renderer = None
+
+
+def _init_worker(renderer_options):
+    """Import the heavy modules and do one throwaway render so fonts and CSS are loaded."""
+    global _renderer
+    from renderer import ReportRenderer
+    _renderer = ReportRenderer(**renderer_options)
+    try:
+        _render_in_worker(json.loads(json.dumps(WARMUP_PACKAGE)))
+    except Exception as e:
+        print(f"Warm-up render failed: {e}", file=sys.stderr)
+
+
+def _render_in_worker(data_package):
+    return _renderer.create_pdf(data_package, None).pdf
+
+
+# --- Server side ---
+
+class RenderService:
+    """Bounded pool of warm renderer processes plus request metrics."""
+
+    def __init__(self, workers=2, renderer_options=None):
+        self.workers = workers
+        # Parallelism comes from the worker pool, so renderers draw charts in-process
+        self.options = {'chart_workers': 0, **(renderer_options or {})}
+        self.pool = self._new_pool()
+        self._pool_lock = threading.Lock()
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.restarts = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=1000)
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.options,))
+
+    def warm_up(self):
+        """Start every worker now rather than on the first requests."""
+        for future in [self.pool.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def _restart(self, broken):
+        """Replace a pool broken by a dead worker (OOM, crash in native code) with a fresh, warmed one."""
+        with self._pool_lock:
+            if self.pool is not broken:
+                return  # another request already replaced it
+            print("Render worker died; restarting the pool", file=sys.stderr)
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._new_pool()
+            self.warm_up()
+            with self.lock:
+                self.restarts += 1
+
+    def _submit(self, data_package):
+        """Render in the pool; a request hit by a broken pool is retried once on a fresh pool."""
+        for attempt in range(2):
+            pool = self.pool
+            try:
+                return pool.submit(_render_in_worker, data_package).result()
+            except BrokenProcessPool:
+                if attempt:
+                    raise
+                self._restart(pool)
+
+    def render(self, data_package):
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            return self._submit(data_package)
+        except Exception:
+            with self.lock:
+                self.errors += 1
+            raise
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+                self.latencies.append(time.perf_counter() - start)
+
+    def metrics(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+
+            def pct(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 4) if latencies else None
+
+            return {
+                'uptime_s': round(time.time() - self.started, 1),
+                'workers': self.workers,
+                'requests': self.requests,
+                'errors': self.errors,
+                'restarts': self.restarts,
+                'in_flight': self.in_flight,
+                'latency_p50_s': pct(0.5),
+                'latency_p95_s': pct(0.95),
+                'latency_mean_s': round(sum(latencies) / len(latencies), 4) if latencies else None,
+            }
+
+    def close(self):
+        self.pool.shutdown()
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    server_version = 'ReportRender/1.0'
+
+    def address_string(self):
+        # Unix socket peers have no host address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def _send(self, status, body, content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, {'status': 'ok'})
+        elif self.path == '/metrics':
+            self._send(200, self.server.service.metrics())
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/render':
+            self._send(404, {'error': 'not found'})
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        if length <= 0 or length > MAX_REQUEST_BYTES:
+            self._send(413 if length else 400, {'error': 'missing or oversized body'})
+            return
+        try:
+            data_package = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            self._send(400, {'error': f'invalid JSON: {e}'})
+            return
+        try:
+            pdf = self.server.service.render(data_package)
+        except Exception as e:
+            self._send(500, {'error': f'{type(e).__name__}: {e}'})
+            return
+        self._send(200, pdf, 'application/pdf')
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, host='127.0.0.1', port=8765, socket_path=None):
+    """HTTP server bound to localhost, or to a Unix socket if socket_path is given."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, RenderHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), RenderHandler)
+    server.service = service
+    return server
+
+
+# --- Client ---
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class RenderClient:
+    """Thin client for the render server.
+
+    address is an http://host:port URL or unix:///path/to/socket.
+    """
+
+    def __init__(self, address=None, timeout=300):
+        self.address = address or os.environ.get('REPORT_RENDER_SERVER', 'http://127.0.0.1:8765')
+        self.timeout = timeout
+
+    def _connection(self):
+        url = urlparse(self.address)
+        if url.scheme == 'unix':
+            return _UnixHTTPConnection(url.path, timeout=self.timeout)
+        return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=self.timeout)
+
+    def _request(self, method, path, body=None):
+        conn = self._connection()
+        try:
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        finally:
+            conn.close()
+        if response.status != 200:
+            try:
+                message = json.loads(data).get('error', data)
+            except ValueError:
+                message = data
+            raise RuntimeError(f"Render server returned {response.status}: {message}")
+        return data
+
+    def render(self, data_package):
+        """Render a data package and return the PDF bytes."""
+        return self._request('POST', '/render', json.dumps(data_package).encode('utf-8'))
+
+    def health(self):
+        return json.loads(self._request('GET', '/health'))
+
+    def metrics(self):
+        return json.loads(self._request('GET', '/metrics'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('serve', help='run the render server')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+    p.add_argument('--socket', help='listen on this Unix socket instead of TCP')
+    p.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 1) // 2))
+    p.add_argument('--chart-backend', default='matplotlib', choices=['matplotlib', 'native'])
+
+    p = sub.add_parser('render', help='render a data package JSON file through a running server')
+    p.add_argument('package')
+    p.add_argument('-o', '--output', default='report.pdf')
+    p.add_argument('--server', help='http://host:port or unix:///path (default: $REPORT_RENDER_SERVER)')
+
+    args = parser.parse_args()
+
+    if args.command == 'render':
+        with open(args.package, encoding='utf-8') as f:
+            data_package = json.load(f)
+        start = time.perf_counter()
+        pdf = RenderClient(args.server).render(data_package)
+        with open(args.output, 'wb') as f:
+            f.write(pdf)
+        print(f"Wrote {args.output} ({len(pdf):,} bytes) in {time.perf_counter() - start:.2f}s")
+        return
+
+    service = RenderService(workers=args.workers, renderer_options={'chart_backend': args.chart_backend})
+    print(f"Warming up {args.workers} worker(s)...")
+    service.warm_up()
+    server = make_server(service, args.host, args.port, args.socket)
+    print(f"Render server listening on {'unix://' + args.socket if args.socket else f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,84 +5,528 @@ import os
 if sys.platform == 'darwin':
     os.environ['DYLD_FALLBACK_LIBRARY_PATH'] = '/opt/homebrew/lib:' + os.environ.get('DYLD_FALLBACK_LIBRARY_PATH', '')
 
-import markdown
-from weasyprint import HTML, CSS
-from jinja2 import Environment, FileSystemLoader
-import matplotlib.pyplot as plt
-import matplotlib
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 import io
 import re
+from html import escape
+import json
+import time
+import base64
+import logging
+import threading
+from importlib import metadata
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from disk_cache import DiskCache, cache_dir, content_hash
+from svg_charts import make_native_svg_chart, MAX_MARKERS
+from downsample import downsample_chart, simplify_svg_paths, FIGURE_WIDTH_IN
+from markdown_engine import convert as convert_markdown
+from image_assets import ImagePipeline, CONTENT_WIDTH_IN, LOGO_WIDTH_IN, PRINT_DPI
+from resource_store import ResourceStore
+from functools import partial, lru_cache
+
+logger = logging.getLogger(__name__)
+
+# matplotlib and weasyprint are imported on first use so that importing this
+# module (and rendering from a warm chart cache) stays fast.
 
-# Load Brand Style
 assets_dir = os.path.join(os.path.dirname(__file__), 'assets')
-matplotlib.style.use(os.path.join(assets_dir, 'brand.mplstyle'))
+brand_style = os.path.join(assets_dir, 'brand.mplstyle')
+with open(brand_style, 'rb') as f:
+    brand_style_bytes = f.read()
+
+_plt = None
+_pyplot_lock = threading.Lock()
+
+
+def _pyplot():
+    """Import pyplot with the brand style loaded (once per process)."""
+    global _plt
+    if _plt is None:
+        import matplotlib.pyplot as plt
+        plt.style.use(brand_style)
+        _plt = plt
+    return _plt
+
+
+@lru_cache(maxsize=None)
+def _matplotlib_version():
+    # Read from package metadata so cache lookups don't import matplotlib
+    return metadata.version('matplotlib')
+
+
+# Bump when chart markup changes so cached charts are redrawn
+CHART_VERSION = 2
+
+
+def chart_cache_key(chart_config, backend='matplotlib', max_points=None, embed=None):
+    """Cache key for a chart: its config, the backend, the SVG/PNG settings, the brand style and the matplotlib version."""
+    config = [chart_config.get(k) for k in ('type', 'title', 'data', 'x_label', 'y_label', 'format')]
+    return content_hash(CHART_VERSION, config, backend, max_points, embed, brand_style_bytes, _matplotlib_version())
+
+
+# Bump when section fragment HTML changes so cached fragments are rebuilt
+FRAGMENT_VERSION = 5
+
+# Placeholders for position-dependent values (section id, figure/table numbers, ...)
+# in cached section fragments; private-use characters so they can't clash with content
+_mark_re = re.compile('\ue000(\\w+)\ue001')
+
+
+def _mark(name):
+    return f'\ue000{name}\ue001'
+
+
+def _fill(text, values):
+    """Replace the placeholders in text with their values."""
+    return _mark_re.sub(lambda m: values[m.group(1)], text)
+
+
+def _roman(number):
+    """Chapter number as a Roman numeral."""
+    numeral = ''
+    for value, letters in ((1000, 'M'), (900, 'CM'), (500, 'D'), (400, 'CD'), (100, 'C'), (90, 'XC'),
+                           (50, 'L'), (40, 'XL'), (10, 'X'), (9, 'IX'), (5, 'V'), (4, 'IV'), (1, 'I')):
+        count, number = divmod(number, value)
+        numeral += letters * count
+    return numeral
+
+
+# Charts whose SVG exceeds either limit are embedded as a PNG at print DPI
+# instead: WeasyPrint draws every path and glyph of an inline SVG, so dense
+# scatter and line charts are slow to lay out and bloat the PDF
+MAX_SVG_ELEMENTS = 2000
+MAX_SVG_BYTES = 300_000
+_png_data_re = re.compile(r'src="data:image/png;base64,([^"]*)"')
+_svg_element_re = re.compile(r'<(?:path|use|rect|circle|ellipse|line|polyline|polygon|text|image)\b')
+
+
+def svg_complexity(svg):
+    """(drawn element count, byte size) of an SVG string."""
+    return len(_svg_element_re.findall(svg)), len(svg.encode('utf-8'))
+
+
+def chart_format(chart_config, svg, max_elements=MAX_SVG_ELEMENTS, max_bytes=MAX_SVG_BYTES):
+    """'svg' or 'png' for a chart: the config's 'format' if it sets one, else by the complexity of its SVG.
+
+    A limit of None is not checked.
+    """
+    title = chart_config.get('title', '')
+    forced = chart_config.get('format', 'auto')
+    if forced in ('svg', 'png'):
+        logger.info("Chart %r: %s (set in chart config)", title, forced)
+        return forced
+    elements, size = svg_complexity(svg)
+    heavy = (max_elements is not None and elements > max_elements) or (max_bytes is not None and size > max_bytes)
+    choice = 'png' if heavy else 'svg'
+    logger.info("Chart %r: %s (%d elements, %d bytes of SVG)", title, choice, elements, size)
+    return choice
+
+
+def markup_format(markup):
+    """'png' or 'svg' for chart markup from make_chart(), None if there is no chart."""
+    if not markup:
+        return None
+    return 'png' if markup.startswith('<img') else 'svg'
+
+
+def _init_chart_worker():
+    """Preload matplotlib and the brand style in a chart pool worker."""
+    _pyplot()
+
+
+_jinja_env = None
+_stylesheets = threading.local()
+
+
+def get_template():
+    """The report template from a process-wide environment with an on-disk bytecode cache."""
+    global _jinja_env
+    if _jinja_env is None:
+        bytecode_dir = cache_dir('jinja')
+        os.makedirs(bytecode_dir, exist_ok=True)
+        _jinja_env = Environment(loader=FileSystemLoader(assets_dir), bytecode_cache=FileSystemBytecodeCache(bytecode_dir))
+    # auto_reload: recompiled only if template.html changed
+    return _jinja_env.get_template('template.html')
+
+
+def _fetcher_key(url_fetcher):
+    """What of a url_fetcher shapes the parsed stylesheet: a CachingURLFetcher's settings, else the fetcher itself."""
+    from fetcher import CachingURLFetcher
+    if isinstance(url_fetcher, CachingURLFetcher):
+        images = url_fetcher.images
+        return type(url_fetcher), url_fetcher.offline, url_fetcher.vendor_dir, images.dpi if images else None
+    return url_fetcher
+
+
+def get_stylesheet(url_fetcher=None):
+    """(CSS, FontConfiguration) for style.css, parsed once per thread and fetcher setup and re-parsed only when the file's mtime changes.
+
+    Imported stylesheets and @font-face files are fetched (through url_fetcher)
+    while parsing, so a cached stylesheet costs no further fetches; renderers
+    with different fetchers (e.g. offline and online) get separate copies.
+    The FontConfiguration holds fontconfig/Pango state that layout mutates
+    and isn't safe to share between threads, so each thread gets its own copy
+    (like the Markdown converters) rather than serialising every layout
+    behind a lock: concurrent create_pdf calls stay concurrent, at the cost
+    of one parse per thread.
+    """
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    path = os.path.join(assets_dir, 'style.css')
+    mtime = os.path.getmtime(path)
+    key = _fetcher_key(url_fetcher)
+    stylesheets = getattr(_stylesheets, 'cache', None)
+    if stylesheets is None:
+        stylesheets = _stylesheets.cache = {}
+    cached = stylesheets.get(key)
+    if cached is None or cached[0] != mtime:
+        font_config = FontConfiguration()
+        cached = stylesheets[key] = (mtime, CSS(filename=path, font_config=font_config, url_fetcher=url_fetcher), font_config)
+    return cached[1], cached[2]
+
+
+def make_svg_chart(chart_config, max_points=None):
+    """Generate SVG chart based on configuration."""
+    if not chart_config or not chart_config.get('data'):
+        return ""
+    # pyplot keeps global figure state, so concurrent renders in one process plot one at a time
+    with _pyplot_lock:
+        return _save_svg(_plot_chart(chart_config, max_points))
+
+
+def make_chart(chart_config, max_points=None, max_elements=MAX_SVG_ELEMENTS, max_bytes=MAX_SVG_BYTES, dpi=PRINT_DPI):
+    """Chart markup for the report: inline SVG, or a PNG <img> at dpi when the SVG is too heavy (see chart_format)."""
+    if not chart_config or not chart_config.get('data'):
+        return ""
+    with _pyplot_lock:
+        plt = _plot_chart(chart_config, max_points)
+        # Charts set to PNG in their config skip the SVG
+        svg = _save_svg(plt) if chart_config.get('format') != 'png' else ''
+        if chart_format(chart_config, svg, max_elements, max_bytes) == 'svg':
+            return svg
+        return _save_png(plt, chart_config, dpi)
+
+
+def make_png_chart(chart_config, max_points=None, dpi=PRINT_DPI):
+    """Chart markup as a PNG <img> at dpi."""
+    if not chart_config or not chart_config.get('data'):
+        return ""
+    with _pyplot_lock:
+        return _save_png(_plot_chart(chart_config, max_points), chart_config, dpi)
+
+
+def _save_png(plt, chart_config, dpi):
+    # The figure is drawn across the content width, so this gives dpi on the page
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', dpi=dpi * CONTENT_WIDTH_IN / FIGURE_WIDTH_IN, bbox_inches='tight',
+                transparent=True, metadata={'Software': None})
+    png = base64.b64encode(buf.getvalue()).decode('ascii')
+    alt = escape(chart_config.get('title', ''), quote=True)
+    return f'<img class="chart-image" src="data:image/png;base64,{png}" alt="{alt}">'
+
+
+def _save_svg(plt):
+    buf = io.StringIO()
+    # No Date metadata so identical configs give byte-identical SVG
+    plt.savefig(buf, format='svg', bbox_inches='tight', transparent=True, metadata={'Date': None})
+    return simplify_svg_paths(buf.getvalue())
+
+
+def _plot_chart(chart_config, max_points):
+    """Draw the chart on a fresh pyplot figure (callers hold _pyplot_lock)."""
+    # Dense line/scatter series are reduced to what the printed figure can show
+    chart_config, _ = downsample_chart(chart_config, max_points)
+
+    plt = _pyplot()
+    plt.close('all')
+
+    chart_type = chart_config.get('type', 'bar')
+    title = chart_config.get('title', '')
+    data = chart_config.get('data')
+    x_label = chart_config.get('x_label', '')
+    y_label = chart_config.get('y_label', '')
+
+    fig, ax = plt.subplots(figsize=(8, 4))
+
+    # Handle different data formats
+    if isinstance(data, dict):
+        # Simple key-value data
+        labels = list(data.keys())
+        values = list(data.values())
+
+        if chart_type == 'bar':
+            bars = ax.bar(labels, values)
+            ax.bar_label(bars, padding=3)
+        elif chart_type == 'horizontal_bar':
+            bars = ax.barh(labels, values)
+            ax.bar_label(bars, padding=3)
+        elif chart_type == 'line':
+            ax.plot(labels, values, marker='o' if len(values) <= MAX_MARKERS else None, linewidth=2, markersize=6)
+        elif chart_type == 'scatter':
+            ax.scatter(labels, values, s=100, alpha=0.7)
+
+    elif isinstance(data, list):
+        # Multi-series data
+        for series in data:
+            series_name = series.get('name', 'Series')
+            series_values = series.get('values', [])
+            series_labels = series.get('labels', range(len(series_values)))
+
+            if chart_type == 'line':
+                ax.plot(series_labels, series_values, marker='o' if len(series_values) <= MAX_MARKERS else None, label=series_name, linewidth=2, markersize=6)
+            elif chart_type in ['bar', 'stacked_bar']:
+                # For now, simple multiple bars (stacked would need more complex logic)
+                ax.bar(series_labels, series_values, label=series_name, alpha=0.8)
+
+        if len(data) > 1:
+            ax.legend(loc='best', frameon=False)
+
+    ax.set_title(title, loc='left', pad=15)
+    if x_label:
+        ax.set_xlabel(x_label)
+    if y_label:
+        ax.set_ylabel(y_label)
+
+    # Rotate x-axis labels if they're long
+    if isinstance(data, dict) and max([len(str(k)) for k in data.keys()]) > 10:
+        plt.xticks(rotation=45, ha='right')
+
+    return plt
+
+
+def page_index(items, anchors):
+    """Add the page number to every item from build_document(), given {anchor: page index}.
+
+    Pages are numbered from 1 at the cover, as in the footers; items whose
+    anchor isn't in the document get None.
+    """
+    return {kind: [dict(entry, page=anchors[entry['id']] + 1 if entry['id'] in anchors else None) for entry in entries]
+            for kind, entries in items.items()}
+
+
+class _Span:
+    """Times a block; reports it to the tracer and, for phases, adds it to the render's timings."""
+    __slots__ = ('name', 'attrs', 'tracer', 'timings', 'start')
+
+    def __init__(self, name, attrs, tracer, timings):
+        self.name = name
+        self.attrs = attrs
+        self.tracer = tracer
+        self.timings = timings
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        if self.timings is not None:
+            self.timings[self.name] = self.timings.get(self.name, 0) + seconds
+        if self.tracer is not None:
+            self.tracer(self.name, seconds, self.attrs)
+        return False
+
+
+class _NullSpan:
+    """Stands in for _Span when nobody is listening."""
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class RenderState:
+    """Per-call state of one render: its phase timings and, with spill_charts,
+    the ResourceStore holding its spilled charts.
+
+    Made by the caller of build_document() and passed down, so concurrent
+    renders on one ReportRenderer never share it.
+    """
+
+    def __init__(self, resources=None):
+        self.timings = {}
+        self.resources = resources
+
+    def close(self):
+        if self.resources is not None:
+            self.resources.close()
+            self.resources = None
+
+
+class RenderResult:
+    """What create_pdf() produced.
+
+    When create_pdf() wrote to a path it behaves as that path (str(), open(),
+    os.path) for existing callers. Given a file object, path is that object;
+    given None, path is None and the bytes are in pdf. In both cases there is
+    no path to stand for, so os.fspath() raises TypeError.
+    page_index maps 'sections', 'figures', 'tables' and 'boxes' to lists of
+    {'id', ..., 'page'} in document order, for search and bookmarks.
+    timings maps each phase (charts, sections, template, layout, pdf_write,
+    ...) to its seconds, in the order they ran, plus 'total'. pages is the
+    page count.
+    """
+
+    def __init__(self, path, page_index, timings=None, pdf=None, pages=None):
+        self.path = path
+        self.page_index = page_index
+        self.timings = timings or {}
+        self.pdf = pdf
+        self.pages = pages
+
+    def __fspath__(self):
+        if not isinstance(self.path, (str, bytes, os.PathLike)):
+            raise TypeError("This PDF was not written to a path; "
+                            + ("its bytes are in .pdf" if self.pdf is not None else "it went to the given file object"))
+        return os.fspath(self.path)
+
+    def __str__(self):
+        return os.fspath(self)
+
+    def __repr__(self):
+        return f"RenderResult({self.path!r})"
+
 
 class ReportRenderer:
-    def __init__(self):
-        self.env = Environment(loader=FileSystemLoader(assets_dir))
-        self.template = self.env.get_template('template.html')
+    def __init__(self, chart_workers=None, chart_cache=True, chart_backend='matplotlib', max_chart_points=None,
+                 offline=None, url_fetcher=None, image_dpi=PRINT_DPI, fragment_cache=True, pdf_workers=0,
+                 tracer=None, max_svg_elements=MAX_SVG_ELEMENTS, max_svg_bytes=MAX_SVG_BYTES, spill_charts=False,
+                 size_budget=None):
+        # Worker processes for the chart stage; 0 or 1 renders serially
+        self.chart_workers = (os.cpu_count() or 1) if chart_workers is None else chart_workers
+        self._chart_pool = None
+        # Persistent SVG cache: True for the default location, a DiskCache, or False to disable
+        self.chart_cache = DiskCache(cache_dir('charts')) if chart_cache is True else chart_cache or None
+        # 'matplotlib' or 'native' (direct SVG, see svg_charts.py)
+        if chart_backend not in ('matplotlib', 'native'):
+            raise ValueError(f"Unknown chart backend: {chart_backend}")
+        self.chart_backend = chart_backend
+        # Per-series point limit for line/scatter charts; None derives it from figure width and print DPI
+        self.max_chart_points = max_chart_points
+        # Heavier charts are embedded as PNGs at the image DPI (None disables a limit; see chart_format)
+        self.max_svg_elements = max_svg_elements
+        self.max_svg_bytes = max_svg_bytes
+        # Write chart SVGs/PNGs to a per-render ResourceStore and reference them by URL instead of
+        # inlining them, so WeasyPrint parses a much smaller HTML document
+        self.spill_charts = spill_charts
+        # PDFs over this many bytes go through pdf_tools.fit_to_budget (dedupe, recompress; logs what's left)
+        self.size_budget = size_budget
+        # Fonts/images come from the vendored + cached store (fetcher.py); offline=True never touches the network
+        self.offline = offline
+        self.url_fetcher = url_fetcher
+        # Raster images are right-sized to this DPI for their box (None embeds sources as-is)
+        self.images = ImagePipeline(dpi=image_dpi) if image_dpi else None
+        # Per-section HTML fragments keyed by section content: True, a DiskCache, or False to disable
+        self.fragment_cache = DiskCache(cache_dir('fragments')) if fragment_cache is True else fragment_cache or None
+        # Opt-in: lay out chapters in this many processes and stitch the PDFs (parallel_pdf.py); 0 or 1 is a single pass
+        self.pdf_workers = pdf_workers
+        self._pdf_pool = None
+        self._pdf_pool_settings = None
+        # Optional tracer(name, seconds, attrs), called for every phase and section span;
+        # forward it to logging, OpenTelemetry, ... Without one only phase timings are kept
+        self.tracer = tracer
+
+    def _span(self, name, timings=None, **attrs):
+        """Context manager timing a block. Phases pass their render's timings and
+        always count towards them; other spans cost nothing unless a tracer is set."""
+        if timings is not None:
+            return _Span(name, attrs, self.tracer, timings)
+        if self.tracer is None:
+            return _NULL_SPAN
+        return _Span(name, attrs, self.tracer, None)
 
     def _make_svg_chart(self, chart_config):
         """Generate SVG chart based on configuration."""
-        if not chart_config or not chart_config.get('data'):
-            return ""
-        
-        plt.close('all')
-        
-        chart_type = chart_config.get('type', 'bar')
-        title = chart_config.get('title', '')
-        data = chart_config.get('data')
-        x_label = chart_config.get('x_label', '')
-        y_label = chart_config.get('y_label', '')
-        
-        fig, ax = plt.subplots(figsize=(8, 4))
-        
-        # Handle different data formats
-        if isinstance(data, dict):
-            # Simple key-value data
-            labels = list(data.keys())
-            values = list(data.values())
-            
-            if chart_type == 'bar':
-                bars = ax.bar(labels, values)
-                ax.bar_label(bars, padding=3)
-            elif chart_type == 'horizontal_bar':
-                bars = ax.barh(labels, values)
-                ax.bar_label(bars, padding=3)
-            elif chart_type == 'line':
-                ax.plot(labels, values, marker='o', linewidth=2, markersize=6)
-            elif chart_type == 'scatter':
-                ax.scatter(labels, values, s=100, alpha=0.7)
-                
-        elif isinstance(data, list):
-            # Multi-series data
-            for series in data:
-                series_name = series.get('name', 'Series')
-                series_values = series.get('values', [])
-                series_labels = series.get('labels', range(len(series_values)))
-                
-                if chart_type == 'line':
-                    ax.plot(series_labels, series_values, marker='o', label=series_name, linewidth=2, markersize=6)
-                elif chart_type in ['bar', 'stacked_bar']:
-                    # For now, simple multiple bars (stacked would need more complex logic)
-                    ax.bar(series_labels, series_values, label=series_name, alpha=0.8)
-            
-            if len(data) > 1:
-                ax.legend(loc='best', frameon=False)
-        
-        ax.set_title(title, loc='left', pad=15)
-        if x_label:
-            ax.set_xlabel(x_label)
-        if y_label:
-            ax.set_ylabel(y_label)
-        
-        # Rotate x-axis labels if they're long
-        if isinstance(data, dict) and max([len(str(k)) for k in data.keys()]) > 10:
-            plt.xticks(rotation=45, ha='right')
-        
-        buf = io.StringIO()
-        plt.savefig(buf, format='svg', bbox_inches='tight', transparent=True)
-        return buf.getvalue()
+        if self.chart_backend == 'native':
+            return make_native_svg_chart(chart_config, max_points=self.max_chart_points)
+        return make_svg_chart(chart_config, max_points=self.max_chart_points)
+
+    def _chart_dpi(self):
+        return self.images.dpi if self.images else PRINT_DPI
+
+    def _chart_key(self, chart):
+        embed = (self.max_svg_elements, self.max_svg_bytes, self._chart_dpi())
+        return chart_cache_key(chart, self.chart_backend, self.max_chart_points, embed)
+
+    def _chart_html(self, markup, resources=None, title=''):
+        """Chart markup as it goes into the document: inline, or an <img> of the chart spilled to resources."""
+        if resources is None or not markup:
+            return markup
+        if markup.startswith('<img'):
+            return _png_data_re.sub(lambda m: f'src="{resources.add(base64.b64decode(m.group(1)), ".png")}"', markup, 1)
+        return f'<img src="{resources.add(markup.encode("utf-8"), ".svg")}" alt="{escape(title, quote=True)}">'
+
+    def _render_charts(self, charts):
+        """Render chart configs to SVG (or PNG <img>) markup, in order, serving what we can from the chart cache."""
+        svgs = [None] * len(charts)
+        keys = [None] * len(charts)
+        if self.chart_cache is not None:
+            for i, chart in enumerate(charts):
+                keys[i] = self._chart_key(chart)
+                cached = self.chart_cache.get(keys[i])
+                if cached is not None:
+                    svgs[i] = cached.decode('utf-8')
+                    logger.info("Chart %r: %s (chart cache, %d bytes)", chart.get('title', ''), markup_format(svgs[i]), len(cached))
+
+        missing = [i for i, svg in enumerate(svgs) if svg is None]
+        rendered = self._plot_charts([charts[i] for i in missing])
+        for i, svg in zip(missing, rendered):
+            svgs[i] = svg
+            if self.chart_cache is not None:
+                self.chart_cache.set(keys[i], svg.encode('utf-8'))
+        return svgs
+
+    def _plot_charts(self, charts):
+        """Plot chart configs, in order, using the worker pool for matplotlib if enabled."""
+        plot = partial(make_chart, max_points=self.max_chart_points, max_elements=self.max_svg_elements,
+                       max_bytes=self.max_svg_bytes, dpi=self._chart_dpi())
+        if self.chart_backend == 'native':
+            # Native SVG is drawn directly; charts too heavy for SVG are drawn by matplotlib as PNGs
+            rendered = []
+            for chart in charts:
+                svg = make_native_svg_chart(chart, max_points=self.max_chart_points) if chart.get('format') != 'png' else ''
+                if chart_format(chart, svg, self.max_svg_elements, self.max_svg_bytes) == 'png':
+                    svg = make_png_chart(chart, self.max_chart_points, self._chart_dpi())
+                rendered.append(svg)
+            return rendered
+        if self.chart_workers > 1 and len(charts) > 1:
+            try:
+                if self._chart_pool is None:
+                    self._chart_pool = ProcessPoolExecutor(max_workers=self.chart_workers, initializer=_init_chart_worker)
+                return list(self._chart_pool.map(plot, charts))
+            except (BrokenProcessPool, OSError) as e:
+                logger.warning("Chart pool error, rendering serially: %s", e)
+                self.close()
+        return [plot(chart) for chart in charts]
+
+    def get_url_fetcher(self):
+        """The url_fetcher given to WeasyPrint (a CachingURLFetcher unless one was passed in)."""
+        if self.url_fetcher is None:
+            from fetcher import CachingURLFetcher
+            self.url_fetcher = CachingURLFetcher(offline=self.offline, images=self.images)
+        return self.url_fetcher
+
+    def close(self):
+        """Shut down the chart and PDF worker pools."""
+        if self._chart_pool is not None:
+            self._chart_pool.shutdown()
+            self._chart_pool = None
+        if self._pdf_pool is not None:
+            self._pdf_pool.shutdown()
+            self._pdf_pool = None
 
     def _get_graphic(self):
         """Returns a branded SVG divider."""
@@ -96,59 +540,324 @@ class ReportRenderer:
 
     def _generate_list_of_figures(self, figures_list):
         if not figures_list: return ""
-        html = '<div class="list-of-figures"><h1>List of Figures</h1>'
+        html = ['<div class="list-of-figures"><h1>List of Figures</h1>']
         for fig in figures_list:
-            html += f'''
+            html.append(f'''
             <div class="list-item">
                 <div class="list-item-number">{fig['number']}</div>
                 <div class="list-item-title"><a href="#{fig['id']}">{fig['caption']}</a></div>
             </div>
-            '''
-        html += '</div>'
-        return html
+            ''')
+        html.append('</div>')
+        return "".join(html)
 
     def _generate_list_of_tables(self, tables_list):
         if not tables_list: return ""
-        html = '<div class="list-of-tables"><h1>List of Tables</h1>'
+        html = ['<div class="list-of-tables"><h1>List of Tables</h1>']
         for table in tables_list:
-            html += f'''
+            html.append(f'''
             <div class="list-item">
                 <div class="list-item-number">{table['number']}</div>
                 <div class="list-item-title"><a href="#{table['id']}">{table['caption']}</a></div>
             </div>
-            '''
-        html += '</div>'
-        return html
+            ''')
+        html.append('</div>')
+        return "".join(html)
         
     def _generate_list_of_boxes(self, boxes_list):
         if not boxes_list: return ""
-        html = '<div class="list-of-boxes"><h1>List of Boxes</h1>'
+        html = ['<div class="list-of-boxes"><h1>List of Boxes</h1>']
         for box in boxes_list:
-            html += f'''
+            html.append(f'''
             <div class="list-item">
                 <div class="list-item-number">{box['number']}</div>
                 <div class="list-item-title"><a href="#{box['id']}">{box['caption']}</a></div>
             </div>
-            '''
-        html += '</div>'
-        return html
+            ''')
+        html.append('</div>')
+        return "".join(html)
+
+    def _fragment_key(self, section):
+        """Cache key for a section's fragment: its content and whatever else the fragment depends on."""
+        content = {k: v for k, v in section.items() if k != 'id'}
+        chart = section.get('chart')
+        chart_key = self._chart_key(chart) if chart else None
+        image_path = (section.get('image') or {}).get('path')
+        return content_hash(FRAGMENT_VERSION, content, chart_key, bool(image_path and os.path.exists(image_path)))
+
+    def _section_fragments(self, sections, timings):
+        """Per-section fragments, in order, built only for sections not in the fragment cache."""
+        with self._span('fragment_cache', timings) as span:
+            keys = [self._fragment_key(section) for section in sections]
+            fragments = [None] * len(sections)
+            if self.fragment_cache is not None:
+                for i, key in enumerate(keys):
+                    cached = self.fragment_cache.get(key)
+                    if cached is not None:
+                        fragments[i] = json.loads(cached)
+            missing = [i for i, fragment in enumerate(fragments) if fragment is None]
+            span.set(sections=len(sections), hits=len(sections) - len(missing))
+
+        # Render the charts of the sections we rebuild up front (in parallel when enabled)
+        with self._span('charts', timings) as span:
+            charts = [sections[i]['chart'] for i in missing if sections[i].get('chart')]
+            chart_svgs = iter(self._render_charts(charts))
+            span.set(charts=len(charts))
+
+        with self._span('sections', timings) as span:
+            for i in missing:
+                section = sections[i]
+                chart_svg = next(chart_svgs) if section.get('chart') else ""
+                with self._span('section', index=i, layout=section.get('layout', 'standard')) as section_span:
+                    fragments[i] = self._build_fragment(section, chart_svg)
+                    section_span.set(chart_type=section['chart'].get('type', 'bar') if section.get('chart') else None,
+                                     chart_format=markup_format(chart_svg),
+                                     chart_bytes=len(chart_svg),
+                                     markdown_chars=len(section.get('main_text') or '') + len(section.get('side_text') or ''),
+                                     html_bytes=len(fragments[i]['html']))
+                if self.fragment_cache is not None:
+                    self.fragment_cache.set(keys[i], json.dumps(fragments[i]).encode('utf-8'))
+            span.set(sections=len(missing))
+        return fragments
+
+    def _build_fragment(self, section, svg_raw):
+        """Render one section to HTML with placeholders for everything that depends on its position.
+
+        Returns a dict with the HTML and the section's numbered items: figure
+        captions (None for a figure number used by a missing image), table
+        captions, the box title, the image path and the chart markup.
+        """
+        layout = section.get('layout', 'standard')
+        section_id = _mark('id')
+        fragment = {'chapter': layout == 'chapter', 'figures': [], 'tables': [], 'box': None, 'image': None, 'chart': svg_raw}
+
+        # Render Markdown; tables in the main text are numbered and captioned by the converter
+        main_md, fragment['tables'] = convert_markdown(
+            section.get('main_text', ''), lambda index: _mark(f'tab{index}'), section.get('tables'))
+        side_md, _ = convert_markdown(section.get('side_text', ''))
+
+        # Chart, numbered within its chapter
+        chart_svg = ""
+        if section.get('chart'):
+            figure_num = _mark(f"fig{len(fragment['figures'])}")
+            fig_id = f"fig-{figure_num}"
+            chart_title = section["chart"].get("title", "Untitled Chart")
+            fragment['figures'].append(chart_title)
+
+            # The chart itself is filled in at assembly, inline or spilled (see _chart_html)
+            chart_svg = f'<div class="chart-wrapper" id="{fig_id}">{_mark("chart")}<div class="chart-caption">Figure {figure_num}: {chart_title}</div></div>'
+
+        # Handle Images (AI-generated or external) with chapter-based numbering
+        image_html = ""
+        if section.get('image'):
+            figure_num = _mark(f"fig{len(fragment['figures'])}")
+            fig_id = f"fig-{figure_num}"
+            fragment['figures'].append(None)
+
+            image_config = section['image']
+            image_path = None
+
+            # Use existing path if provided
+            if image_config.get('path'):
+                image_path = image_config['path']
+
+            if image_path and os.path.exists(image_path):
+                # The (optimized) image URL is resolved at assembly, so cached fragments never point at evicted files
+                fragment['image'] = image_path
+                caption = image_config.get('caption', f'Figure {figure_num}')
+                # If caption doesn't already have Figure number, add it
+                if not caption.startswith('Figure'):
+                    caption_text = caption
+                    caption = f'Figure {figure_num}: {caption}'
+                else:
+                    caption_text = caption.split(':', 1)[1].strip() if ':' in caption else caption
+
+                fragment['figures'][-1] = caption_text
+
+                image_html = f'''
+                <div class="figure" id="{fig_id}">
+                    <img src="{_mark('img')}" class="figure-image" alt="{caption}">
+                    <div class="figure-caption">{caption}</div>
+                </div>
+                '''
+
+        # Pull Quote
+        pull_quote_html = ""
+        if section.get('pull_quote'):
+            pull_quote_html = f'<div class="pull-quote">{section["pull_quote"]}</div>'
+
+        # Layout Construction
+        if layout == "chapter":
+            # 'first' becomes " first-chapter" on the report's first chapter
+            html = f"""
+            <section id="{section_id}" class="layout-chapter{_mark('first')}">
+                <div class="chapter-content">
+                    <div class="chapter-number">CHAPTER</div>
+                    <h1 class="chapter-title">{section.get('title', 'Chapter')}</h1>
+                    {self._get_graphic()}
+                </div>
+            </section>
+            """
+
+        elif layout == "front_matter":
+            html = f"""
+            <section id="{section_id}" class="layout-front-matter">
+                <h1>{section.get('title', 'Section')}</h1>
+                {self._get_graphic()}
+                {main_md}
+            </section>
+            """
+
+        elif layout == "abbreviations":
+            html = f"""
+            <section id="{section_id}" class="layout-front-matter layout-abbreviations">
+                <h1>{section.get('title', 'Abbreviations')}</h1>
+                {self._get_graphic()}
+                {main_md}
+            </section>
+            """
+
+        elif layout == "acknowledgements":
+            html = f"""
+            <section id="{section_id}" class="layout-front-matter layout-acknowledgements">
+                <h1>{section.get('title', 'Acknowledgements')}</h1>
+                {self._get_graphic()}
+                {main_md}
+            </section>
+            """
+
+        elif layout == "executive_summary":
+            html = f"""
+            <section id="{section_id}" class="layout-executive-summary">
+                <h1>{section.get('title', 'Executive Summary')}</h1>
+                {self._get_graphic()}
+                {main_md}
+            </section>
+            """
+
+        elif layout == "references":
+            html = f"""
+            <section id="{section_id}" class="layout-references">
+                <h1>{section.get('title', 'References')}</h1>
+                {self._get_graphic()}
+                <div class="references-list">
+                    {main_md}
+                </div>
+            </section>
+            """
+
+        elif layout == "annex":
+            html = f"""
+            <section id="{section_id}" class="layout-annex">
+                <h1>Annex: {section.get('title', 'Appendix')}</h1>
+                {self._get_graphic()}
+                {main_md}
+                {chart_svg}
+            </section>
+            """
+
+        elif layout == "box":
+            # Boxes are listed but not numbered
+            box_title = section.get('title', 'Box')
+            fragment['box'] = box_title
+
+            html = f"""
+            <section id="{section_id}" class="layout-box">
+                <div class="box-header">
+                    <div class="box-label">{box_title}</div>
+                </div>
+                <div class="box-content">
+                    {image_html}
+                    {main_md}
+                    {chart_svg}
+                </div>
+            </section>
+            """
+
+        elif layout == "split":
+            html = f"""
+            <section id="{section_id}" class="layout-split">
+                <div class="split-left">
+                    <h1>{section.get('title', 'Overview')}</h1>
+                    {self._get_graphic()}
+                    {main_md}
+                </div>
+                <div class="split-right">
+                    {chart_svg}
+                    <div style="font-size:1.1em; color:#56696d;">{side_md}</div>
+                </div>
+            </section>
+            """
+
+        elif layout == "sidebar":
+            html = f"""
+            <section id="{section_id}" class="layout-sidebar">
+                <div class="sidebar-col">
+                    <h4>KEY INSIGHTS</h4>
+                    {self._get_graphic()}
+                    {side_md}
+                </div>
+                <div class="main-col">
+                    {main_md}
+                    {chart_svg}
+                </div>
+            </section>
+            """
+
+        elif layout == "hero":
+            html = f"""
+            <section id="{section_id}" class="layout-hero">
+                <div class="hero-container">
+                    {main_md}
+                    {chart_svg}
+                </div>
+            </section>
+            """
+
+        else: # Standard Columns
+            html = f"""
+            <section id="{section_id}" class="layout-standard">
+                {pull_quote_html}
+                {image_html}
+                {chart_svg}
+                {main_md}
+            </section>
+            """
+
+        fragment['html'] = html
+        return fragment
+
+    def build_document(self, data_package, state=None):
+        """Template context, a generator of (section, HTML) in document order, and the indexed items.
+
+        The context has everything but the sections (cover, TOC and lists);
+        render_html() streams the sections into the template, parallel_pdf.py
+        splits them into chunks. The items ({'sections', 'figures', 'tables',
+        'boxes'}: lists of dicts with an anchor 'id') are what page_index()
+        looks up once the document is laid out. Phase timings and spilled
+        charts go to state (a RenderState; a throwaway one if not given).
+        """
+        if state is None:
+            state = RenderState()
+        sections = data_package['sections']
 
-    def create_pdf(self, data_package, output_path="report.pdf"):
-        html_sections = ""
-        
         # Generate TOC and Assign IDs
-        toc_html = '<div class="toc"><h1>Table of Contents</h1>'
-        
-        for i, section in enumerate(data_package['sections']):
+        toc_html = ['<div class="toc"><h1>Table of Contents</h1>']
+        sections_list = []
+
+        for i, section in enumerate(sections):
             section_id = f"section-{i}"
             section['id'] = section_id
             title = section.get('title', 'Untitled')
-            
+            sections_list.append({'id': section_id, 'title': title, 'layout': section.get('layout', 'standard')})
+
             # Add to TOC if it's a Chapter or Front Matter
             if section.get('layout') in ['chapter', 'front_matter', 'split', 'executive_summary', 'abbreviations', 'acknowledgements', 'annex', 'references']:
-                toc_html += f'<div class="toc-item"><a href="#{section_id}">{title}</a></div>'
-        
-        toc_html += '</div>'
+                toc_html.append(f'<div class="toc-item"><a href="#{section_id}">{title}</a></div>')
+
+        toc_html.append('</div>')
+
+        fragments = self._section_fragments(sections, state.timings)
 
         # Track items for lists
         figures_list = []
@@ -159,275 +868,145 @@ class ReportRenderer:
         current_chapter = 0
         chapter_figure_count = 0
         chapter_table_count = 0
-        roman_numerals = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
-
-        # Render Sections
-        for section in data_package['sections']:
-            layout = section.get('layout', 'standard')
-            section_id = section.get('id')
-            
-            # Track chapter for numbering
-            if layout == "chapter":
+
+        # Numbering pass: work out each section's placeholder values in document order
+        section_values = []
+        for section, fragment in zip(sections, fragments):
+            if fragment['chapter']:
                 current_chapter += 1
                 chapter_figure_count = 0
                 chapter_table_count = 0
-            
-            # Render Markdown (Enable Tables, Footnotes, and Extra Features)
-            md_extensions = ['tables', 'footnotes', 'extra', 'nl2br', 'sane_lists']
-            main_md = markdown.markdown(section.get('main_text', ''), extensions=md_extensions)
-            side_md = markdown.markdown(section.get('side_text', ''), extensions=md_extensions)
-            
-            # Process Tables in Markdown
-            # Find <table> tags and wrap them with captions/numbering
-            def table_replacer(match):
-                nonlocal chapter_table_count
+            chapter_roman = _roman(current_chapter) if current_chapter > 0 else ""
+
+            values = {
+                'id': section['id'],
+                'first': " first-chapter" if fragment['chapter'] and current_chapter == 1 else "",
+            }
+            for i in range(len(fragment['tables'])):
                 chapter_table_count += 1
-                chapter_roman = roman_numerals[current_chapter - 1] if current_chapter > 0 else ""
-                table_num = f"{chapter_roman}.{chapter_table_count}" if chapter_roman else str(chapter_table_count)
-                table_id = f"table-{table_num}"
-                
-                # Try to find a caption provided in the section data or use a generic one
-                # For now, we'll use a generic one or extract from previous paragraph if we were smarter
-                # But let's check if 'tables' metadata exists in section
-                caption = f"Table {table_num}"
-                if section.get('tables') and len(section['tables']) >= chapter_table_count:
-                    caption = section['tables'][chapter_table_count-1].get('caption', caption)
-                
-                tables_list.append({'number': table_num, 'caption': caption, 'id': table_id})
-                
-                return f'<div class="table-wrapper" id="{table_id}"><div class="table-caption">Table {table_num}: {caption}</div>{match.group(0)}</div>'
-
-            main_md = re.sub(r'<table>.*?</table>', table_replacer, main_md, flags=re.DOTALL)
-
-            
-            # Generate Chart with chapter-based numbering
-            chart_svg = ""
-            if section.get('chart'):
+                values[f'tab{i}'] = f"{chapter_roman}.{chapter_table_count}" if chapter_roman else str(chapter_table_count)
+            for i in range(len(fragment['figures'])):
                 chapter_figure_count += 1
-                chapter_roman = roman_numerals[current_chapter - 1] if current_chapter > 0 else ""
-                figure_num = f"{chapter_roman}.{chapter_figure_count}" if chapter_roman else str(chapter_figure_count)
-                fig_id = f"fig-{figure_num}"
-                
-                svg_raw = self._make_svg_chart(section['chart'])
-                chart_title = section["chart"].get("title", "Untitled Chart")
-                
-                figures_list.append({'number': figure_num, 'caption': chart_title, 'id': fig_id})
-                
-                chart_svg = f'<div class="chart-wrapper" id="{fig_id}">{svg_raw}<div class="chart-caption">Figure {figure_num}: {chart_title}</div></div>'
-
-            # Handle Images (AI-generated or external) with chapter-based numbering
-            image_html = ""
-            if section.get('image'):
-                chapter_figure_count += 1
-                chapter_roman = roman_numerals[current_chapter - 1] if current_chapter > 0 else ""
-                figure_num = f"{chapter_roman}.{chapter_figure_count}" if chapter_roman else str(chapter_figure_count)
-                fig_id = f"fig-{figure_num}"
-                
-                image_config = section['image']
-                image_path = None
-                
-                # Use existing path if provided
-                if image_config.get('path'):
-                    image_path = image_config['path']
-                
-                if image_path and os.path.exists(image_path):
-                    image_url = "file://" + os.path.abspath(image_path)
-                    caption = image_config.get('caption', f'Figure {figure_num}')
-                    # If caption doesn't already have Figure number, add it
-                    if not caption.startswith('Figure'):
-                        caption_text = caption
-                        caption = f'Figure {figure_num}: {caption}'
-                    else:
-                        caption_text = caption.split(':', 1)[1].strip() if ':' in caption else caption
-                    
-                    figures_list.append({'number': figure_num, 'caption': caption_text, 'id': fig_id})
-                    
-                    image_html = f'''
-                    <div class="figure" id="{fig_id}">
-                        <img src="{image_url}" class="figure-image" alt="{caption}">
-                        <div class="figure-caption">{caption}</div>
-                    </div>
-                    '''
-
-            # Pull Quote
-            pull_quote_html = ""
-            if section.get('pull_quote'):
-                pull_quote_html = f'<div class="pull-quote">{section["pull_quote"]}</div>'
-
-            # Layout Construction
-            if layout == "chapter":
-                chapter_classes = "layout-chapter"
-                if current_chapter == 1:
-                    chapter_classes += " first-chapter"
-                
-                html_sections += f"""
-                <section id="{section_id}" class="{chapter_classes}">
-                    <div class="chapter-content">
-                        <div class="chapter-number">CHAPTER</div>
-                        <h1 class="chapter-title">{section.get('title', 'Chapter')}</h1>
-                        {self._get_graphic()}
-                    </div>
-                </section>
-                """
-
-            elif layout == "front_matter":
-                html_sections += f"""
-                <section id="{section_id}" class="layout-front-matter">
-                    <h1>{section.get('title', 'Section')}</h1>
-                    {self._get_graphic()}
-                    {main_md}
-                </section>
-                """
-                
-            elif layout == "abbreviations":
-                html_sections += f"""
-                <section id="{section_id}" class="layout-front-matter layout-abbreviations">
-                    <h1>{section.get('title', 'Abbreviations')}</h1>
-                    {self._get_graphic()}
-                    {main_md}
-                </section>
-                """
-
-            elif layout == "acknowledgements":
-                html_sections += f"""
-                <section id="{section_id}" class="layout-front-matter layout-acknowledgements">
-                    <h1>{section.get('title', 'Acknowledgements')}</h1>
-                    {self._get_graphic()}
-                    {main_md}
-                </section>
-                """
+                values[f'fig{i}'] = f"{chapter_roman}.{chapter_figure_count}" if chapter_roman else str(chapter_figure_count)
+            if fragment['image']:
+                image_path = fragment['image']
+                values['img'] = self.images.url_for(image_path, CONTENT_WIDTH_IN) if self.images else "file://" + os.path.abspath(image_path)
 
-            elif layout == "executive_summary":
-                html_sections += f"""
-                <section id="{section_id}" class="layout-executive-summary">
-                    <h1>{section.get('title', 'Executive Summary')}</h1>
-                    {self._get_graphic()}
-                    {main_md}
-                </section>
-                """
+            for i, caption in enumerate(fragment['tables']):
+                tables_list.append({'number': values[f'tab{i}'], 'caption': _fill(caption, values), 'id': f"table-{values[f'tab{i}']}"})
+            for i, caption in enumerate(fragment['figures']):
+                if caption is not None:
+                    figures_list.append({'number': values[f'fig{i}'], 'caption': _fill(caption, values), 'id': f"fig-{values[f'fig{i}']}"})
+            if fragment['box'] is not None:
+                boxes_list.append({'number': '', 'caption': fragment['box'], 'id': section['id']})
+            section_values.append(values)
 
-            elif layout == "references":
-                html_sections += f"""
-                <section id="{section_id}" class="layout-references">
-                    <h1>{section.get('title', 'References')}</h1>
-                    {self._get_graphic()}
-                    <div class="references-list">
-                        {main_md}
-                    </div>
-                </section>
-                """
-
-            elif layout == "annex":
-                html_sections += f"""
-                <section id="{section_id}" class="layout-annex">
-                    <h1>Annex: {section.get('title', 'Appendix')}</h1>
-                    {self._get_graphic()}
-                    {main_md}
-                    {chart_svg}
-                </section>
-                """
-
-            elif layout == "box":
-                # Track box
-                chapter_roman = roman_numerals[current_chapter - 1] if current_chapter > 0 else ""
-                # Box numbering usually per chapter too, or sequential. Let's do per chapter.
-                # But we need a box counter. Let's assume box numbering is handled or we add it.
-                # For now, just list it.
-                box_title = section.get('title', 'Box')
-                boxes_list.append({'number': '', 'caption': box_title, 'id': section_id})
-                
-                html_sections += f"""
-                <section id="{section_id}" class="layout-box">
-                    <div class="box-header">
-                        <div class="box-label">{box_title}</div>
-                    </div>
-                    <div class="box-content">
-                        {image_html}
-                        {main_md}
-                        {chart_svg}
-                    </div>
-                </section>
-                """
-
-            elif layout == "split":
-                html_sections += f"""
-                <section id="{section_id}" class="layout-split">
-                    <div class="split-left">
-                        <h1>{section.get('title', 'Overview')}</h1>
-                        {self._get_graphic()}
-                        {main_md}
-                    </div>
-                    <div class="split-right">
-                        {chart_svg}
-                        <div style="font-size:1.1em; color:#56696d;">{side_md}</div>
-                    </div>
-                </section>
-                """
-            
-            elif layout == "sidebar":
-                html_sections += f"""
-                <section id="{section_id}" class="layout-sidebar">
-                    <div class="sidebar-col">
-                        <h4>KEY INSIGHTS</h4>
-                        {self._get_graphic()}
-                        {side_md}
-                    </div>
-                    <div class="main-col">
-                        {main_md}
-                        {chart_svg}
-                    </div>
-                </section>
-                """
-                
-            elif layout == "hero":
-                html_sections += f"""
-                <section id="{section_id}" class="layout-hero">
-                    <div class="hero-container">
-                        {main_md}
-                        {chart_svg}
-                    </div>
-                </section>
-                """
-                
-            else: # Standard Columns
-                html_sections += f"""
-                <section id="{section_id}" class="layout-standard">
-                    {pull_quote_html}
-                    {image_html}
-                    {chart_svg}
-                    {main_md}
-                </section>
-                """
+        def section_html():
+            # Filled one at a time as the template consumes them; each fragment's
+            # HTML is released once it has been emitted
+            for section, fragment, values in zip(sections, fragments, section_values):
+                values['chart'] = self._chart_html(fragment.pop('chart'), state.resources,
+                                                   (section.get('chart') or {}).get('title', ''))
+                yield section, _fill(fragment.pop('html'), values)
 
         # Append Lists to TOC/Front Matter
         # We want them after TOC.
-        lists_html = ""
+        lists_html = []
         if figures_list:
-            lists_html += self._generate_list_of_figures(figures_list)
+            lists_html.append(self._generate_list_of_figures(figures_list))
         if tables_list:
-            lists_html += self._generate_list_of_tables(tables_list)
+            lists_html.append(self._generate_list_of_tables(tables_list))
         if boxes_list:
-            lists_html += self._generate_list_of_boxes(boxes_list)
-            
+            lists_html.append(self._generate_list_of_boxes(boxes_list))
+
         # Combine TOC and Lists
-        toc_and_lists = toc_html + lists_html
+        toc_and_lists = "".join(toc_html + lists_html)
 
         # Assembly
-        logo_path = "file://" + os.path.abspath("assets/logo.png") if os.path.exists("assets/logo.png") else ""
-        
-        full_html = self.template.render(
-            title=data_package['meta']['title'],
-            subtitle=data_package['meta']['subtitle'],
-            date=data_package['meta']['date'],
-            summary=data_package['meta']['summary'],
-            logo_path=logo_path,
-            toc=toc_and_lists,
-            dynamic_content=html_sections
-        )
-
-        # PDF Generation
-        html_obj = HTML(string=full_html, base_url=assets_dir)
-        css_obj = CSS(filename=os.path.join(assets_dir, 'style.css'))
-        html_obj.write_pdf(output_path, stylesheets=[css_obj])
-        
-        return output_path
+        logo_path = ""
+        if os.path.exists("assets/logo.png"):
+            logo_path = self.images.url_for("assets/logo.png", LOGO_WIDTH_IN) if self.images else "file://" + os.path.abspath("assets/logo.png")
+
+        context = {
+            'title': data_package['meta']['title'],
+            'subtitle': data_package['meta']['subtitle'],
+            'date': data_package['meta']['date'],
+            'summary': data_package['meta']['summary'],
+            'logo_path': logo_path,
+            'cover': True,
+            'toc': toc_and_lists,
+        }
+        items = {'sections': sections_list, 'figures': figures_list, 'tables': tables_list, 'boxes': boxes_list}
+        return context, section_html(), items
+
+    def render_html(self, data_package):
+        """Build the report HTML (everything before WeasyPrint)."""
+        context, sections, _ = self.build_document(data_package)
+        # Stream the sections through the template and join once at the end
+        return "".join(get_template().generate(sections=(html for _, html in sections), **context))
+
+    def create_pdf(self, data_package, output_path="report.pdf"):
+        """Render the report to output_path: a file path, a writable binary
+        file object, or None to get the PDF bytes back without touching disk.
+
+        Returns a RenderResult: usable as the output path, with the PDF bytes
+        in .pdf (output_path=None), the page number of every section, figure,
+        table and box in .page_index and the seconds spent in each phase in
+        .timings.
+        """
+        # Spilled charts must outlive the layout that reads them, and no longer
+        state = RenderState(ResourceStore() if self.spill_charts else None)
+        try:
+            return self._create_pdf(data_package, output_path, state)
+        finally:
+            state.close()
+
+    def _create_pdf(self, data_package, output_path, state):
+        timings = state.timings
+        start = time.perf_counter()
+        # With a size budget the PDF is checked in memory before it goes to output_path
+        target = io.BytesIO() if output_path is None or self.size_budget is not None else output_path
+
+        def result(anchors, items, pages):
+            pdf = target.getvalue() if target is not output_path else None
+            if self.size_budget is not None:
+                import pdf_tools
+                with self._span('optimize', timings) as span:
+                    pdf = pdf_tools.fit_to_budget(pdf, self.size_budget)
+                    span.set(bytes=len(pdf), budget=self.size_budget)
+                if output_path is not None:
+                    if hasattr(output_path, 'write'):
+                        output_path.write(pdf)
+                    else:
+                        with open(output_path, 'wb') as f:
+                            f.write(pdf)
+                    pdf = None
+            timings['total'] = time.perf_counter() - start
+            return RenderResult(output_path, page_index(items, anchors), timings, pdf, pages)
+
+        context, sections, items = self.build_document(data_package, state)
+        if self.pdf_workers > 1:
+            import parallel_pdf
+            # Kept, so a fallback to a single pass doesn't build (and time) the sections again
+            sections = list(sections)
+            anchors, pages = parallel_pdf.write_chunked(self, context, sections, target, timings)
+            if anchors is not None:
+                return result(anchors, items, pages)
+
+        with self._span('template', timings):
+            full_html = "".join(get_template().generate(sections=(html for _, html in sections), **context))
+
+        # PDF Generation: one layout pass. TOC and list page numbers are
+        # target-counter()s, which WeasyPrint fills in by re-laying out only the
+        # pages that reference them; the same Document gives the page index.
+        from weasyprint import HTML
+        with self._span('layout', timings) as span:
+            css_obj, font_config = get_stylesheet(self.get_url_fetcher())
+            html_obj = HTML(string=full_html, base_url=assets_dir, url_fetcher=self.get_url_fetcher())
+            document = html_obj.render(stylesheets=[css_obj], font_config=font_config)
+            span.set(pages=len(document.pages), html_bytes=len(full_html))
+        with self._span('pdf_write', timings):
+            document.write_pdf(target)
+
+        return result({name: index for index, page in enumerate(document.pages) for name in page.anchors}, items,
+                      len(document.pages))
@@ -0,0 +1,41 @@
+"""Per-render resource store.
+
+Large generated resources (chart SVGs and PNGs) are written here instead of
+being pasted into the report HTML, and referenced by file:// URL so they are
+loaded through the renderer's url_fetcher like any other image. Files are
+named by content hash, so identical charts share one file (and one image in
+WeasyPrint's per-document image cache). Worker processes of a chunked render
+read the same files.
+"""
+import os
+import shutil
+import tempfile
+
+from disk_cache import content_hash
+
+
+class ResourceStore:
+    """Content-addressed files in a temporary directory, removed by close()."""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.directory = None
+        self.files = 0
+        self.bytes = 0
+
+    def add(self, data, extension):
+        """Store data and return its file:// URL."""
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix='report-resources-', dir=self.parent)
+        path = os.path.join(self.directory, content_hash(data) + extension)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(data)
+            self.files += 1
+            self.bytes += len(data)
+        return 'file://' + path
+
+    def close(self):
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Search Result Cache
+SQLite cache for the research agent's web searches, so the same fact-checks
+across reports don't go back to DuckDuckGo (and get rate-limited):
+
+    python search_cache.py stats
+    python search_cache.py clear
+
+Entries are keyed by the normalized query (case and whitespace folded) and
+max_results. A result younger than ttl is served as is; one younger than
+ttl + stale_ttl is served immediately while a background thread fetches a
+fresh copy (stale-while-revalidate), and also if that fetch fails. When the
+database grows past max_bytes the least recently used entries are dropped.
+In offline mode (offline=True or REPORT_OFFLINE=1) only cached results are
+served, however old.
+
+Hits, stale hits and misses are counted in the same database, across runs
+and processes, so `stats` shows the hit rate to tune the TTLs by.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+
+from disk_cache import cache_dir
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_STALE_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+COUNTERS = ('hits', 'stale_hits', 'misses', 'offline_misses', 'refreshes', 'errors')
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """TTL + stale-while-revalidate cache of search results in SQLite."""
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, stale_ttl=DEFAULT_STALE_TTL, max_bytes=DEFAULT_MAX_BYTES,
+                 offline=None):
+        self.path = path or os.path.join(cache_dir('search'), 'search.sqlite')
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.offline = os.environ.get('REPORT_OFFLINE') == '1' if offline is None else offline
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE IF NOT EXISTS results (query TEXT, max_results INTEGER, results TEXT, size INTEGER,'
+                       ' fetched_at REAL, used_at REAL, PRIMARY KEY (query, max_results))')
+            db.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)')
+
+    @contextmanager
+    def _connect(self):
+        """A connection for one transaction; searches run on several threads."""
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _count(self, name):
+        with self._connect() as db:
+            db.execute('INSERT INTO counters VALUES (?, 1) ON CONFLICT (name) DO UPDATE SET value = value + 1', (name,))
+
+    def _lookup(self, key):
+        with self._connect() as db:
+            row = db.execute('SELECT results, fetched_at FROM results WHERE query = ? AND max_results = ?', key).fetchone()
+            if row is not None:
+                db.execute('UPDATE results SET used_at = ? WHERE query = ? AND max_results = ?', (time.time(), *key))
+        return (json.loads(row[0]), row[1]) if row else (None, None)
+
+    def _store(self, key, results):
+        data = json.dumps(results)
+        now = time.time()
+        with self._connect() as db:
+            db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)', (*key, data, len(data), now, now))
+            total = db.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            if total > self.max_bytes:
+                for query, max_results, size in db.execute(
+                        'SELECT query, max_results, size FROM results ORDER BY used_at').fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    db.execute('DELETE FROM results WHERE query = ? AND max_results = ?', (query, max_results))
+                    total -= size
+
+    def _refresh(self, key, fetch):
+        try:
+            self._store(key, fetch())
+            self._count('refreshes')
+        except Exception as e:
+            logger.info("Background refresh of %r failed: %s", key[0], e)
+            self._count('errors')
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get(self, query, max_results, fetch):
+        """Results for query: cached when fresh enough, else fetch() (whose result is stored).
+
+        In offline mode a query that was never cached gives [].
+        """
+        key = (normalize_query(query), max_results)
+        results, fetched_at = self._lookup(key)
+        age = time.time() - fetched_at if results is not None else None
+
+        if results is not None and (age < self.ttl or self.offline):
+            self._count('hits')
+            return results
+        if self.offline:
+            self._count('offline_misses')
+            return []
+        if results is not None and age < self.ttl + self.stale_ttl:
+            self._count('stale_hits')
+            with self._lock:
+                start = key not in self._refreshing
+                self._refreshing.add(key)
+            if start:
+                threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+            return results
+
+        self._count('misses')
+        try:
+            fresh = fetch()
+        except Exception:
+            self._count('errors')
+            if results is not None:
+                # Too old to serve normally, but better than nothing
+                return results
+            raise
+        self._store(key, fresh)
+        return fresh
+
+    def clear(self):
+        """Remove every cached result and reset the counters."""
+        with self._connect() as db:
+            db.execute('DELETE FROM results')
+            db.execute('DELETE FROM counters')
+
+    def stats(self):
+        """Hit/miss counters (since the cache was created or cleared) plus entry count and size."""
+        with self._connect() as db:
+            entries, size = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+            counts = dict.fromkeys(COUNTERS, 0)
+            counts.update(db.execute('SELECT name, value FROM counters').fetchall())
+        served = counts['hits'] + counts['stale_hits']
+        lookups = served + counts['misses'] + counts['offline_misses']
+        return dict(counts, hit_rate=served / lookups if lookups else 0.0, entries=entries, bytes=size,
+                    max_bytes=self.max_bytes)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_search_cache():
+    """The process-wide SearchCache."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = SearchCache()
+    return _shared
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('stats', help='hit rate, entry count and size')
+    sub.add_parser('clear', help='remove every cached result')
+    args = parser.parse_args()
+
+    cache = SearchCache()
+    if args.command == 'clear':
+        cache.clear()
+    stats = cache.stats()
+    print(f"{stats['entries']} cached searches, {stats['bytes']:,} bytes (limit {stats['max_bytes']:,}) in {cache.path}")
+    if args.command == 'stats':
+        print(f"hit rate {stats['hit_rate']:.0%}: {stats['hits']} hits, {stats['stale_hits']} stale hits, "
+              f"{stats['misses']} misses, {stats['offline_misses']} offline misses; "
+              f"{stats['refreshes']} background refreshes, {stats['errors']} errors")
+
+
+if __name__ == '__main__':
+    main()
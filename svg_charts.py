@@ -0,0 +1,319 @@
+"""Native SVG chart backend.
+
+Draws the chart types supported by ReportRenderer straight to SVG markup with
+plain string/number math, styled from assets/brand.mplstyle, so that charts
+need neither matplotlib nor its glyph-path-heavy SVG output.
+"""
+import os
+import re
+import math
+from xml.sax.saxutils import escape
+
+from downsample import downsample_chart
+
+assets_dir = os.path.join(os.path.dirname(__file__), 'assets')
+
+# Figure size matches the matplotlib backend (8x4 in at 72 pt/in)
+WIDTH = 576
+HEIGHT = 288
+# Line charts with more points than this are drawn without per-point markers
+MAX_MARKERS = 60
+
+
+def load_brand_style(path=os.path.join(assets_dir, 'brand.mplstyle')):
+    """Parse the subset of a .mplstyle file used for native charts."""
+    rc = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if ':' in line:
+                key, value = line.split(':', 1)
+                rc[key.strip()] = value.strip()
+
+    def color(key, default):
+        value = rc.get(key, default)
+        return '#' + value if re.fullmatch(r'[0-9a-fA-F]{6}', value) else value
+
+    cycle = re.findall(r"'([0-9a-fA-F]{6})'", rc.get('axes.prop_cycle', ''))
+    return {
+        'palette': ['#' + c for c in cycle] or ['#1f77b4'],
+        'text': color('text.color', '000000'),
+        'title': color('axes.titlecolor', '000000'),
+        'title_size': float(rc.get('axes.titlesize', 12)),
+        'title_weight': rc.get('axes.titleweight', 'normal'),
+        'label': color('axes.labelcolor', '000000'),
+        'tick': color('xtick.color', '000000'),
+        'edge': color('axes.edgecolor', '000000'),
+        'grid': rc.get('axes.grid', 'False') == 'True',
+        'grid_color': color('grid.color', 'b0b0b0'),
+        'grid_width': float(rc.get('grid.linewidth', 0.8)),
+        'grid_dash': rc.get('grid.linestyle', '-') == '--',
+        'spines': {side: rc.get(f'axes.spines.{side}', 'True') == 'True' for side in ('top', 'right', 'left', 'bottom')},
+        'font': ', '.join([*[f.strip() for f in rc.get('font.sans-serif', '').split(',') if f.strip()], 'sans-serif']),
+    }
+
+
+BRAND = load_brand_style()
+
+
+def _num(v):
+    """Compact coordinate formatting (1 decimal, no trailing zeros)."""
+    s = f'{v:.1f}'
+    return s[:-2] if s.endswith('.0') else s
+
+
+def _fmt(v):
+    return f'{v:g}' if isinstance(v, (int, float)) else str(v)
+
+
+def nice_ticks(lo, hi, count=5):
+    """Round tick values covering [lo, hi]."""
+    if hi == lo:
+        hi, lo = hi + 1, lo - (1 if lo else 0)
+    raw = (hi - lo) / count
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw)
+    start = math.floor(lo / step) * step
+    ticks = []
+    v = start
+    while v <= hi + step * 1e-9:
+        ticks.append(round(v, 10))
+        v += step
+    if ticks[-1] < hi:
+        ticks.append(round(v, 10))
+    return ticks
+
+
+def _value(v):
+    """v as a float, or None when it is missing, not a number or not finite (NaN, inf)."""
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None
+    return v if math.isfinite(v) else None
+
+
+def _series(chart_config):
+    """Normalise chart data to (categories, [(name, [values])], numeric_x).
+
+    Values are coerced to floats (LLM-extracted data often has numeric
+    strings); anything that isn't a finite number becomes a gap (None).
+    """
+    data = chart_config.get('data')
+    if isinstance(data, dict):
+        return [str(k) for k in data.keys()], [('', [_value(v) for v in data.values()])], False
+
+    labels = {}
+    series = []
+    for s in data:
+        values = [_value(v) for v in s.get('values', [])]
+        series_labels = list(s.get('labels', range(len(values))))
+        series.append((s.get('name', 'Series'), dict(zip(series_labels, values))))
+        # dict keys keep first-seen label order
+        labels.update(dict.fromkeys(series_labels))
+    labels = list(labels)
+    numeric_x = all(isinstance(l, (int, float)) for l in labels)
+    if numeric_x:
+        labels = sorted(labels)
+    return labels, [(name, [values.get(l) for l in labels]) for name, values in series], numeric_x
+
+
+class _Canvas:
+    def __init__(self, style):
+        self.style = style
+        self.parts = []
+
+    def line(self, x1, y1, x2, y2, color, width=1, dash=False):
+        extra = ' stroke-dasharray="3 1.5"' if dash else ''
+        self.parts.append(f'<line x1="{_num(x1)}" y1="{_num(y1)}" x2="{_num(x2)}" y2="{_num(y2)}" stroke="{color}" stroke-width="{width:g}"{extra}/>')
+
+    def rect(self, x, y, w, h, color, opacity=1):
+        extra = f' fill-opacity="{opacity:g}"' if opacity < 1 else ''
+        self.parts.append(f'<rect x="{_num(x)}" y="{_num(y)}" width="{_num(w)}" height="{_num(h)}" fill="{color}"{extra}/>')
+
+    def text(self, x, y, s, size=10, color=None, anchor='start', weight=None, rotate=None, baseline=None):
+        attrs = f'x="{_num(x)}" y="{_num(y)}" font-size="{size:g}"'
+        if color and color != self.style['text']:
+            attrs += f' fill="{color}"'
+        if anchor != 'start':
+            attrs += f' text-anchor="{anchor}"'
+        if weight and weight != 'normal':
+            attrs += f' font-weight="{weight}"'
+        if baseline:
+            attrs += f' dominant-baseline="{baseline}"'
+        if rotate:
+            attrs += f' transform="rotate({rotate:g} {_num(x)} {_num(y)})"'
+        self.parts.append(f'<text {attrs}>{escape(str(s))}</text>')
+
+    def polyline(self, points, color, width=2):
+        coords = ' '.join(f'{_num(x)},{_num(y)}' for x, y in points)
+        self.parts.append(f'<polyline points="{coords}" fill="none" stroke="{color}" stroke-width="{width:g}" stroke-linejoin="round"/>')
+
+    def markers(self, points, color, r=3, opacity=1):
+        extra = f' fill-opacity="{opacity:g}"' if opacity < 1 else ''
+        self.parts.append(f'<g fill="{color}"{extra}>' + ''.join(
+            f'<circle cx="{_num(x)}" cy="{_num(y)}" r="{r:g}"/>' for x, y in points) + '</g>')
+
+
+def make_native_svg_chart(chart_config, style=None, max_points=None):
+    """Generate a brand-styled SVG chart without matplotlib."""
+    if not chart_config or not chart_config.get('data'):
+        return ""
+
+    # Dense line/scatter series are reduced to what the printed figure can show
+    chart_config, _ = downsample_chart(chart_config, max_points)
+
+    style = style or BRAND
+    chart_type = chart_config.get('type', 'bar')
+    title = chart_config.get('title', '')
+    x_label = chart_config.get('x_label', '')
+    y_label = chart_config.get('y_label', '')
+    categories, series, numeric_x = _series(chart_config)
+    horizontal = chart_type == 'horizontal_bar'
+    stacked = chart_type == 'stacked_bar'
+    is_bar = chart_type in ('bar', 'horizontal_bar', 'stacked_bar')
+
+    # Value range (bars always include zero)
+    if stacked:
+        totals = [sum(v or 0 for v in vals) for vals in zip(*(values for _, values in series))]
+        all_values = totals + [0]
+    else:
+        all_values = [v for _, values in series for v in values if v is not None]
+    if not categories or not all_values:
+        # Series without values
+        return ""
+    if is_bar:
+        all_values.append(0)
+    ticks = nice_ticks(min(all_values), max(all_values))
+    vmin, vmax = ticks[0], ticks[-1]
+
+    rotate_labels = not horizontal and not numeric_x and max(len(str(c)) for c in categories) > 10
+    category_gutter = max(len(str(c)) for c in categories) * 5.5 + 10 if horizontal else 0
+    left = 50 + (14 if y_label else 0) + category_gutter
+    bottom = HEIGHT - 30 - (14 if x_label else 0) - (max(len(str(c)) for c in categories) * 4 if rotate_labels else 0)
+    top = 40 if title else 15
+    right = WIDTH - 15
+    plot_w, plot_h = right - left, bottom - top
+
+    c = _Canvas(style)
+
+    def value_pos(v):
+        span = (vmax - vmin) or 1
+        if horizontal:
+            return left + (v - vmin) / span * plot_w
+        return bottom - (v - vmin) / span * plot_h
+
+    n = len(categories)
+    if numeric_x and not is_bar:
+        xmin, xmax = categories[0], categories[-1]
+
+        def cat_pos(i):
+            return left + ((categories[i] - xmin) / ((xmax - xmin) or 1)) * plot_w
+    else:
+        band = (plot_h if horizontal else plot_w) / max(n, 1)
+
+        def cat_pos(i):
+            if horizontal:
+                # Matplotlib draws the first category at the bottom
+                return bottom - (i + 0.5) * band
+            return left + (i + 0.5) * band
+
+    # Grid and value axis ticks
+    for t in ticks:
+        p = value_pos(t)
+        if horizontal:
+            if style['grid']:
+                c.line(p, top, p, bottom, style['grid_color'], style['grid_width'], style['grid_dash'])
+            c.text(p, bottom + 14, _fmt(t), 8, style['tick'], 'middle')
+        else:
+            if style['grid']:
+                c.line(left, p, right, p, style['grid_color'], style['grid_width'], style['grid_dash'])
+            c.text(left - 6, p, _fmt(t), 8, style['tick'], 'end', baseline='middle')
+
+    # Category axis ticks
+    if numeric_x and not is_bar:
+        for t in nice_ticks(categories[0], categories[-1]):
+            if categories[0] <= t <= categories[-1]:
+                x = left + (t - categories[0]) / ((categories[-1] - categories[0]) or 1) * plot_w
+                c.text(x, bottom + 14, _fmt(t), 8, style['tick'], 'middle')
+    else:
+        for i, cat in enumerate(categories):
+            p = cat_pos(i)
+            if horizontal:
+                c.text(left - 6, p, _fmt(cat), 8, style['tick'], 'end', baseline='middle')
+            elif rotate_labels:
+                c.text(p, bottom + 10, _fmt(cat), 8, style['tick'], 'end', rotate=-45)
+            else:
+                c.text(p, bottom + 14, _fmt(cat), 8, style['tick'], 'middle')
+
+    # Data
+    palette = style['palette']
+    if is_bar:
+        groups = 1 if stacked else len(series)
+        bar_w = band * 0.8 / groups
+        base = [0] * n
+        for s_idx, (name, values) in enumerate(series):
+            color = palette[s_idx % len(palette)]
+            opacity = 0.8 if len(series) > 1 else 1
+            for i, v in enumerate(values):
+                if v is None:
+                    continue
+                start = base[i] if stacked else 0
+                end = start + v
+                offset = -band * 0.4 + (0 if stacked else s_idx * bar_w)
+                p0, p1 = value_pos(min(start, end)), value_pos(max(start, end))
+                if horizontal:
+                    c.rect(p0, cat_pos(i) + offset, p1 - p0, bar_w, color, opacity)
+                    if len(series) == 1:
+                        if v < 0:
+                            c.text(p0 - 3, cat_pos(i) + offset + bar_w / 2, _fmt(v), 8, style['text'], 'end', baseline='middle')
+                        else:
+                            c.text(p1 + 3, cat_pos(i) + offset + bar_w / 2, _fmt(v), 8, style['text'], baseline='middle')
+                else:
+                    c.rect(cat_pos(i) + offset, p1, bar_w, p0 - p1, color, opacity)
+                    if len(series) == 1:
+                        label_y = p0 + 10 if v < 0 else p1 - 3
+                        c.text(cat_pos(i) + offset + bar_w / 2, label_y, _fmt(v), 8, style['text'], 'middle')
+                if stacked:
+                    base[i] = end
+    else:
+        for s_idx, (name, values) in enumerate(series):
+            color = palette[s_idx % len(palette)]
+            points = [(cat_pos(i), value_pos(v)) for i, v in enumerate(values) if v is not None]
+            if chart_type == 'scatter':
+                c.markers(points, color, r=5, opacity=0.7)
+            else:
+                c.polyline(points, color)
+                if len(points) <= MAX_MARKERS:
+                    c.markers(points, color, r=3)
+
+    # Spines
+    if style['spines']['left']:
+        c.line(left, top, left, bottom, style['edge'], 0.8)
+    if style['spines']['bottom']:
+        c.line(left, bottom, right, bottom, style['edge'], 0.8)
+    if style['spines']['top']:
+        c.line(left, top, right, top, style['edge'], 0.8)
+    if style['spines']['right']:
+        c.line(right, top, right, bottom, style['edge'], 0.8)
+
+    # Labels, title and legend
+    if x_label:
+        c.text(left + plot_w / 2, HEIGHT - 8, x_label, 10, style['label'], 'middle')
+    if y_label:
+        c.text(12, top + plot_h / 2, y_label, 10, style['label'], 'middle', rotate=-90)
+    if title:
+        c.text(left, 22, title, style['title_size'], style['title'], weight=style['title_weight'])
+    if len(series) > 1:
+        y = top + 4
+        for s_idx, (name, _) in enumerate(series):
+            color = palette[s_idx % len(palette)]
+            c.rect(right - 110, y, 10, 8, color)
+            c.text(right - 95, y + 4, name, 8, style['text'], baseline='middle')
+            y += 14
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}pt" height="{HEIGHT}pt" viewBox="0 0 {WIDTH} {HEIGHT}" '
+        f'font-family="{escape(style["font"])}" fill="{style["text"]}">'
+        + ''.join(c.parts) + '</svg>'
+    )
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Layout Split Check
+Splits long markdown with agent.split_for_layout and checks that no text is
+lost and fenced code blocks stay whole (no API calls):
+
+    python test_agent.py
+"""
+
+from agent import split_for_layout
+
+PARAGRAPH = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+CODE = "```python\n# not a heading\nx = 1\n\n\n# still code\ny = 2\n\nz = 3\n"
+
+
+def parts(text, max_chars=300):
+    result = split_for_layout(text, max_chars)
+    assert "".join(part['text'] for part in result) == text
+    return result
+
+
+def test_fenced_block_stays_whole():
+    text = "# Intro\n\n" + f"{PARAGRAPH}\n\n" * 3 + CODE + "```\n\n" + f"{PARAGRAPH}\n\n" * 3
+    result = parts(text)
+    assert len(result) > 1
+    assert sum(CODE in part['text'] for part in result) == 1
+
+
+def test_unterminated_fence_keeps_the_rest():
+    text = "# Intro\n\n" + f"{PARAGRAPH}\n\n" * 3 + CODE + f"{PARAGRAPH}\n\n" * 2
+    result = parts(text)
+    assert result[-1]['text'].endswith(f"{PARAGRAPH}\n\n")
+
+
+def test_headings_in_fences_are_not_split_at():
+    text = "# Intro\n\n" + f"{PARAGRAPH}\n\n" + CODE + "```\n\n# Next\n\n" + f"{PARAGRAPH}\n\n" * 2
+    result = parts(text, max_chars=400)
+    assert [part['heading'] for part in result if not part['continues']] == ["Intro", "Next"]
+    assert not any(part['text'].startswith("# not a heading") or part['text'].startswith("# still code")
+                   for part in result)
+
+
+def main():
+    tests = [(name, test) for name, test in globals().items() if name.startswith('test_')]
+    failed = 0
+    for name, test in tests:
+        try:
+            test()
+            print(f"✓ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {name}: {type(e).__name__}: {e}")
+    print(f"{len(tests) - failed}/{len(tests)} checks passed")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
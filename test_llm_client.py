@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+LLM Client Check
+Runs llm_client.LLMClient against a local stand-in for the OpenAI API (no
+network, no real key):
+
+    python test_llm_client.py
+
+The stand-in answers every chat completion from a script of responses, so
+each check can make it fail, rate-limit or truncate on purpose. Responses go
+to a throwaway cache directory.
+"""
+
+import os
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ['REPORT_CACHE_DIR'] = tempfile.mkdtemp(prefix='llm-client-check-')
+
+import llm_client
+from llm_cache import LLMCacheMiss
+
+
+class StandIn:
+    """Chat completions server; queue (status, headers, content) replies with reply()."""
+
+    def __init__(self):
+        self.replies = []
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stand_in.requests.append({'body': body, 'port': self.client_address[1],
+                                          'auth': self.headers.get('Authorization')})
+                status, headers, content, finish = stand_in.replies.pop(0) if stand_in.replies else (200, {}, 'ok', 'stop')
+                if status == 200:
+                    payload = {'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+                               'choices': [{'index': 0, 'finish_reason': finish,
+                                            'message': {'role': 'assistant', 'content': content}}]}
+                else:
+                    payload = {'error': {'message': content, 'type': 'test'}}
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/v1'
+
+    def reply(self, status=200, content='ok', headers=None, finish='stop'):
+        self.replies.append((status, headers or {}, content, finish))
+
+
+stand_in = StandIn()
+_counter = iter(range(1_000_000))
+
+
+def make_client(**kwargs):
+    return llm_client.LLMClient(base_url=stand_in.url, api_key='test', backoff=0.01, **kwargs)
+
+
+def ask(client, **kwargs):
+    # A new prompt every time, so no check sees another one's cached response
+    messages = [{'role': 'user', 'content': f"question {next(_counter)}"}]
+    return client.chat(model='gpt-4o', messages=messages, **kwargs)
+
+
+def test_retries_server_errors():
+    client = make_client(cache=False)
+    stand_in.reply(503, 'busy')
+    stand_in.reply(500, 'oops')
+    stand_in.reply(200, 'answer')
+    assert ask(client).choices[0].message.content == 'answer'
+    assert client.stats()['retries'] == 2
+
+
+def test_honours_retry_after():
+    client = make_client(cache=False)
+    stand_in.reply(429, 'slow down', {'Retry-After': '0'})
+    assert ask(client).choices[0].message.content == 'ok'
+    assert client.stats()['retries'] == 1
+
+
+def test_does_not_retry_bad_requests():
+    import openai
+    client = make_client(cache=False)
+    before = len(stand_in.requests)
+    stand_in.reply(400, 'bad request')
+    try:
+        ask(client)
+    except openai.BadRequestError:
+        pass
+    else:
+        raise AssertionError("a 400 should raise")
+    assert len(stand_in.requests) - before == 1
+    assert client.stats()['errors'] == 1
+
+
+def test_reuses_connections():
+    client = make_client(cache=False)
+    before = len(stand_in.requests)
+    for _ in range(5):
+        ask(client)
+    assert len({request['port'] for request in stand_in.requests[before:]}) == 1
+
+
+def test_caches_responses():
+    client = make_client()
+    messages = [{'role': 'user', 'content': 'cached question'}]
+    before = len(stand_in.requests)
+    first = client.chat(model='gpt-4o', messages=messages)
+    second = client.chat(model='gpt-4o', messages=messages)
+    assert first.choices[0].message.content == second.choices[0].message.content
+    assert len(stand_in.requests) - before == 1
+    assert client.stats()['cache_hits'] == 1
+
+
+def test_does_not_cache_unusable_replies():
+    client = make_client()
+    messages = [{'role': 'user', 'content': 'long question'}]
+    before = len(stand_in.requests)
+    stand_in.reply(200, '{"sections": [', finish='length')
+    client.chat(model='gpt-4o', messages=messages)
+    stand_in.reply(200, 'not json')
+    try:
+        client.chat(model='gpt-4o', messages=messages, check=lambda response: json.loads(response.choices[0].message.content))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("check should raise")
+    stand_in.reply(200, '{"sections": []}')
+    client.chat(model='gpt-4o', messages=messages)
+    client.chat(model='gpt-4o', messages=messages)
+    assert len(stand_in.requests) - before == 3
+
+
+def test_replay_raises_on_a_miss():
+    client = make_client(replay=True)
+    before = len(stand_in.requests)
+    try:
+        ask(client)
+    except LLMCacheMiss:
+        pass
+    else:
+        raise AssertionError("replay mode should not reach the server")
+    assert len(stand_in.requests) == before
+
+
+def test_shared_client_follows_the_api_key():
+    os.environ['OPENAI_BASE_URL'] = stand_in.url
+    for key in ('first-key', 'second-key'):
+        os.environ['OPENAI_API_KEY'] = key
+        ask(llm_client.get_client(), timeout=5)
+        assert stand_in.requests[-1]['auth'] == f'Bearer {key}'
+    ask(llm_client.get_client('explicit-key'))
+    assert stand_in.requests[-1]['auth'] == 'Bearer explicit-key'
+    assert llm_client.get_client('explicit-key') is llm_client.get_client('explicit-key')
+
+
+def main():
+    tests = [(name, test) for name, test in globals().items() if name.startswith('test_')]
+    failed = 0
+    for name, test in tests:
+        try:
+            test()
+            print(f"✓ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {name}: {type(e).__name__}: {e}")
+    print(f"{len(tests) - failed}/{len(tests)} checks passed")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
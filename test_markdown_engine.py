@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Table Numbering Check
+Converts Markdown with markdown_engine.convert and checks which tables get a
+numbered caption (Markdown tables, raw HTML tables, nested and inline ones):
+
+    python test_markdown_engine.py
+"""
+
+import re
+
+from markdown_engine import convert
+
+PIPE_TABLE = '| a | b |\n|---|---|\n| 1 | 2 |'
+
+
+def numbered(text, captions=None):
+    return convert(text, lambda index: str(index + 1), captions)
+
+
+def wrapper_ids(html):
+    return re.findall(r'<div class="table-wrapper" id="table-(\d+)">', html)
+
+
+def test_nested_raw_table_is_wrapped_once():
+    text = '<table><tr><td><table><tr><td>x</td></tr></table></td></tr></table>\n\nafter'
+    html, tables = numbered(text)
+    assert wrapper_ids(html) == ['1'] and len(tables) == 1
+    # The wrapper closes after the outer table, not the inner one
+    assert html.count('</table></div>') == 1
+    assert '</table></td></tr></table></div>' in html
+
+
+def test_inline_raw_table_is_numbered():
+    html, tables = numbered('Text <table><tr><td>a</td></tr></table> more', [{'caption': 'Inline <b>'}])
+    assert wrapper_ids(html) == ['1']
+    assert 'Table 1: Inline &lt;b&gt;</div><table>' in html
+    assert '</table></div> more' in html
+    assert tables == ['Inline <b>']
+
+
+def test_tables_are_numbered_in_document_order():
+    text = f'{PIPE_TABLE}\n\nText <table><tr><td>a</td></tr></table>\n\n<table><tr><td>b</td></tr></table>\n\n{PIPE_TABLE}'
+    html, tables = numbered(text, [{'caption': name} for name in 'ABCD'])
+    assert wrapper_ids(html) == ['1', '2', '3', '4']
+    assert re.findall(r'Table \d: (\w)', html) == ['A', 'B', 'C', 'D']
+    assert tables == ['A', 'B', 'C', 'D']
+
+
+def test_without_numbering_tables_are_left_alone():
+    html, tables = convert(f'{PIPE_TABLE}\n\n<table><tr><td>a</td></tr></table>')
+    assert 'table-wrapper' not in html and tables == []
+
+
+def main():
+    tests = [(name, test) for name, test in globals().items() if name.startswith('test_')]
+    failed = 0
+    for name, test in tests:
+        try:
+            test()
+            print(f"✓ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {name}: {type(e).__name__}: {e}")
+    print(f"{len(tests) - failed}/{len(tests)} checks passed")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+PDF Optimize Check
+Runs pdf_tools.optimize on a generated PDF with uncompressed page content and
+on a report PDF from this repository, and checks the output is smaller:
+
+    python test_pdf_tools.py
+"""
+
+import io
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, NameObject
+
+import pdf_tools
+
+REPORT_PDF = 'test_visualizations.pdf'
+
+
+def sample_pdf(pages=4):
+    """A PDF whose pages draw rectangles from uncompressed content streams."""
+    writer = PdfWriter()
+    for _ in range(pages):
+        page = writer.add_blank_page(595, 842)
+        content = DecodedStreamObject()
+        content.set_data(b''.join(b'0.2 0.4 0.6 rg %d %d 10 10 re f\n' % (x, x) for x in range(400)))
+        page[NameObject('/Contents')] = writer._add_object(content)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def test_recompresses_content_streams():
+    pdf = sample_pdf()
+    optimized = pdf_tools.optimize(pdf)
+    assert len(optimized) < len(pdf) // 2, (len(pdf), len(optimized))
+    assert len(PdfReader(io.BytesIO(optimized)).pages) == 4
+
+
+def test_shrinks_a_report():
+    with open(REPORT_PDF, 'rb') as f:
+        pdf = f.read()
+    optimized = pdf_tools.optimize(pdf)
+    assert len(optimized) < len(pdf), (len(pdf), len(optimized))
+    assert [page.extract_text() for page in PdfReader(io.BytesIO(optimized)).pages] == \
+        [page.extract_text() for page in PdfReader(io.BytesIO(pdf)).pages]
+
+
+def test_fit_to_budget_optimizes_only_over_budget():
+    pdf = sample_pdf()
+    assert pdf_tools.fit_to_budget(pdf, len(pdf)) is pdf
+    assert len(pdf_tools.fit_to_budget(pdf, len(pdf) - 1)) < len(pdf)
+
+
+def main():
+    tests = [(name, test) for name, test in globals().items() if name.startswith('test_')]
+    failed = 0
+    for name, test in tests:
+        try:
+            test()
+            print(f"✓ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {name}: {type(e).__name__}: {e}")
+    print(f"{len(tests) - failed}/{len(tests)} checks passed")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
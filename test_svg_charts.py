@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Native SVG Chart Check
+Draws charts with svg_charts.make_native_svg_chart from the kind of data the
+layout agent extracts (numeric strings, NaN, gaps):
+
+    python test_svg_charts.py
+"""
+
+import re
+
+from svg_charts import make_native_svg_chart
+
+
+def bar_labels(svg):
+    return re.findall(r'text-anchor="middle">([^<]*)</text>', svg)
+
+
+def test_numeric_strings():
+    svg = make_native_svg_chart({'type': 'bar', 'data': {'2023': '12.5', '2024': '14'}})
+    assert svg.startswith('<svg')
+    assert '12.5' in bar_labels(svg) and '14' in bar_labels(svg)
+    svg = make_native_svg_chart({'type': 'line', 'data': [{'name': 'a', 'values': ['1', '2.5', '4']}]})
+    assert svg.count('<circle') == 3
+
+
+def test_non_finite_values_are_dropped():
+    svg = make_native_svg_chart({'type': 'line', 'data': [{'name': 'a', 'values': [1, float('nan'), 3, float('inf'), 'n/a']}]})
+    assert svg.count('<circle') == 2
+    assert not re.search(r'\b(nan|inf)\b', svg)
+    svg = make_native_svg_chart({'type': 'bar', 'data': {'a': float('nan'), 'b': 2}})
+    assert svg.count('<rect') == 1
+
+
+def test_no_usable_values():
+    assert make_native_svg_chart({'type': 'line', 'data': [{'name': 'a', 'values': []}]}) == ""
+    assert make_native_svg_chart({'type': 'scatter', 'data': [{'name': 'a', 'values': [float('nan'), 'x']}]}) == ""
+
+
+def main():
+    tests = [(name, test) for name, test in globals().items() if name.startswith('test_')]
+    failed = 0
+    for name, test in tests:
+        try:
+            test()
+            print(f"✓ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {name}: {type(e).__name__}: {e}")
+    print(f"{len(tests) - failed}/{len(tests)} checks passed")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()